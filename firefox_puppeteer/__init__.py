@@ -7,6 +7,7 @@ import os
 from marionette import HTMLElement
 
 from .decorators import use_class_as_property
+from .helpers import registry
 
 
 root = os.path.abspath(os.path.dirname(__file__))
@@ -47,6 +48,15 @@ class Puppeteer(object):
         See the :class:`~api.keys.Keys` reference.
         """
 
+    @use_class_as_property('api.places.Places')
+    def places(self):
+        """
+        Provides low-level access to the Places database, e.g. for seeding
+        the history with a large amount of visits.
+
+        See the :class:`~api.places.Places` reference.
+        """
+
     @property
     def platform(self):
         """Returns the lowercased platform name.
@@ -64,6 +74,15 @@ class Puppeteer(object):
         See the :class:`~api.prefs.Preferences` reference.
         """
 
+    @use_class_as_property('api.sanitizer.Sanitizer')
+    def sanitizer(self):
+        """
+        Provides an api for clearing browser data like the history, cookies,
+        or the cache.
+
+        See the :class:`~api.sanitizer.Sanitizer` reference.
+        """
+
     @use_class_as_property('ui.windows.Windows')
     def windows(self):
         """
@@ -72,6 +91,53 @@ class Puppeteer(object):
         See the :class:`~ui.window.Windows` reference.
         """
 
+    def batch(self):
+        """Batches deferrable library calls into a single chrome script.
+
+        Calls of :class:`~api.prefs.Preferences` and :class:`~api.l10n.L10n`
+        made inside the `with` block return a :class:`~helpers.Deferred`
+        result, and are executed together when the block exits::
+
+            with self.batch():
+                self.prefs.set_pref('browser.tabs.warnOnClose', False)
+                label = self.browser.get_localized_entity('helpSafeMode.label')
+            self.assertEqual(label.value, 'Restart with Add-ons Disabled...')
+
+        Each call reports its own errors via :attr:`~helpers.Deferred.value`.
+        If any call has failed, a :class:`~errors.BatchError` listing all
+        failures is raised on exit.
+
+        :returns: The :class:`~helpers.Batch` instance.
+        """
+        return registry.batch(self.marionette)
+
+    def reset_state(self, categories=None, window=None):
+        """Resets the browser to a clean state without restarting it.
+
+        The data stores of the given categories are cleared, all chrome windows
+        except `window`, and all tabs except its first one get closed, and all
+        modified preferences are restored.
+
+        :param categories: Optional, list of data categories to clear. See
+         :attr:`~api.sanitizer.Sanitizer.categories` for possible values.
+         Defaults to all categories.
+        :param window: Optional, the :class:`~ui.windows.BrowserWindow` to keep
+         open. Defaults to the current chrome window.
+
+        :returns: The :class:`~ui.windows.BrowserWindow` which has been kept open.
+        """
+        window = window or self.windows.current
+
+        self.sanitizer.clear(categories)
+
+        self.windows.close_all([window])
+        window.switch_to()
+        window.tabbar.close_all_tabs([window.tabbar.tabs[0]])
+
+        self.prefs.restore_all_prefs()
+
+        return window
+
 
 class DOMElement(HTMLElement):
     """
@@ -91,3 +157,105 @@ class DOMElement(HTMLElement):
 
     def get_marionette(self):
         return self.marionette
+
+    @staticmethod
+    def get_attributes(elements, names):
+        """Retrieves the values of attributes for a list of elements.
+
+        All values are fetched with a single command, instead of a
+        `get_attribute` call per element and attribute.
+
+        :param elements: List of DOM elements.
+        :param names: List of attribute names.
+
+        :returns: List of dicts mapping attribute names to values, in the order
+         of `elements`. Missing attributes have a value of `None`.
+        """
+        if not elements:
+            return []
+
+        return elements[0].marionette.execute_script("""
+          let names = arguments[1];
+
+          return arguments[0].map(element => {
+            let values = {};
+            for (let name of names) {
+              values[name] = element.getAttribute(name);
+            }
+            return values;
+          });
+        """, script_args=[list(elements), list(names)])
+
+
+class ElementIndex(object):
+    """Caches a mapping of attribute values to elements inside a container.
+
+    The index gets built via :func:`DOMElement.get_attributes`, and stays
+    valid until the child list of the container, or the indexed attribute of
+    any of its descendants gets mutated. Mutations are tracked in chrome via a
+    `MutationObserver`, so checking the index for validity is a single cheap
+    command.
+
+    :param container: The DOM element which contains the indexed elements.
+    :param elements_getter: Callable which returns the list of elements to
+     index.
+    :param attribute: Name of the attribute to index the elements by.
+    :param wrapper: Optional, callable to wrap each indexed element with.
+    """
+
+    def __init__(self, container, elements_getter, attribute, wrapper=None):
+        self.container = container
+        self.elements_getter = elements_getter
+        self.attribute = attribute
+        self.wrapper = wrapper
+
+        self._generation = None
+        self._index = None
+
+    def get(self, value):
+        """Returns the first element with the given attribute value.
+
+        :param value: The value of the indexed attribute.
+
+        :returns: The element or `None` if no element has been found.
+        """
+        generation = self._get_generation()
+        if self._index is None or generation != self._generation:
+            self._build()
+            self._generation = generation
+
+        return self._index.get(value)
+
+    def _build(self):
+        elements = self.elements_getter()
+        values = DOMElement.get_attributes(elements, [self.attribute])
+
+        wrap = self.wrapper or (lambda element: element)
+        self._index = {}
+        for element, value in zip(elements, values):
+            self._index.setdefault(value[self.attribute], wrap(element))
+
+    def _get_generation(self):
+        # Mutations after this call increase the generation, so an index
+        # built afterwards can only be considered outdated too early
+        return self.container.marionette.execute_script("""
+          let [container, name] = arguments;
+
+          if (!container._puppeteerObservers) {
+            container._puppeteerObservers = {};
+          }
+
+          if (!(name in container._puppeteerObservers)) {
+            let win = container.ownerDocument.defaultView;
+            let observer = new win.MutationObserver(() => observer.generation++);
+            observer.generation = 0;
+            observer.observe(container, {
+              attributeFilter: [name],
+              childList: true,
+              subtree: true
+            });
+            container._puppeteerObservers[name] = observer;
+          }
+
+          return container._puppeteerObservers[name].generation;
+        """, script_args=[self.container, self.attribute])
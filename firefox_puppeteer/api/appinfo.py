@@ -3,20 +3,128 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 from ..base import BaseLib
+from ..helpers import registry
+
+
+registry.register('appinfo.get_snapshot', """
+  function () {
+    let appinfo = {};
+    for (let name in Services.appinfo) {
+      try {
+        let value = Services.appinfo[name];
+        if (value === null || ["boolean", "number", "string"].indexOf(typeof value) != -1) {
+          appinfo[name] = value;
+        }
+      } catch (e) {
+        // Some members are not available in all builds
+      }
+    }
+
+    let sysinfo = {};
+    for (let name of ["arch", "cpucount", "hasWindowsTouchInterface", "memsize", "name",
+                      "version"]) {
+      try {
+        sysinfo[name] = Services.sysinfo.getProperty(name);
+      } catch (e) {
+        sysinfo[name] = null;
+      }
+    }
+
+    let locale = null;
+    try {
+      locale = Cc["@mozilla.org/chrome/chrome-registry;1"]
+                 .getService(Ci.nsIXULChromeRegistry)
+                 .getSelectedLocale("global");
+    } catch (e) {
+    }
+
+    return {appinfo: appinfo, sysinfo: sysinfo, locale: locale};
+  }
+""")
 
 
 class AppInfo(BaseLib):
+    """Provides access to the application and system information of Firefox.
+
+    All values are retrieved with a single command on first access, and
+    are cached for the lifetime of the Marionette session. Members of
+    `Services.appinfo` without a dedicated property can be accessed by their
+    name, e.g. `appinfo.XPCOMABI`.
+    """
+
+    # The snapshot of the last session as tuple of session id and values
+    _snapshot = (None, None)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        try:
+            return self._get_snapshot()['appinfo'][name]
+        except KeyError:
+            raise AttributeError('%s has no attribute "%s"' % (type(self).__name__, name))
+
+    @property
+    def appBuildID(self):
+        """The build ID of the application."""
+        return self._get_property('appBuildID')
 
     @property
     def browserTabsRemoteAutostart(self):
-        return self._get_property("browserTabsRemoteAutostart")
+        """Flag if the browser runs with multiple processes (e10s)."""
+        return self._get_property('browserTabsRemoteAutostart')
+
+    @property
+    def locale(self):
+        """The selected locale of the application, e.g. `en-US`."""
+        return self._get_snapshot()['locale']
+
+    @property
+    def name(self):
+        """The name of the application, e.g. `Firefox`."""
+        return self._get_property('name')
+
+    @property
+    def OS(self):
+        """The name of the operating system, e.g. `Linux`, `Darwin`, or `WINNT`."""
+        return self._get_property('OS')
+
+    @property
+    def platformBuildID(self):
+        """The build ID of the Gecko platform."""
+        return self._get_property('platformBuildID')
+
+    @property
+    def platformVersion(self):
+        """The version of the Gecko platform."""
+        return self._get_property('platformVersion')
+
+    @property
+    def processorCount(self):
+        """The number of logical processors of the machine."""
+        return self._get_snapshot()['sysinfo']['cpucount']
+
+    @property
+    def sysinfo(self):
+        """Dictionary with the basic properties of `Services.sysinfo`.
+
+        It contains `arch`, `cpucount`, `hasWindowsTouchInterface`, `memsize`,
+        `name`, and `version`.
+        """
+        return dict(self._get_snapshot()['sysinfo'])
+
+    @property
+    def version(self):
+        """The version of the application."""
+        return self._get_property('version')
 
     def _get_property(self, prop_name):
-        with self.marionette.using_context('chrome'):
-            return self.marionette.execute_script("""
-              try {
-                return Services.appinfo[arguments[0]];
-              } catch (e) {
-                return null;
-              }
-            """, script_args=[prop_name])
+        return self._get_snapshot()['appinfo'].get(prop_name)
+
+    def _get_snapshot(self):
+        session_id, snapshot = AppInfo._snapshot
+        if snapshot is None or session_id != self.marionette.session_id:
+            snapshot = registry.call(self.marionette, 'appinfo.get_snapshot')
+            AppInfo._snapshot = (self.marionette.session_id, snapshot)
+
+        return snapshot
@@ -7,6 +7,37 @@ import copy
 from marionette.errors import MarionetteException
 
 from ..base import BaseLib
+from ..helpers import registry
+
+
+registry.register('l10n.get_localized_entity', """
+  function (aContents) {
+    let parser = Cc["@mozilla.org/xmlextras/domparser;1"]
+                 .createInstance(Ci.nsIDOMParser);
+    let doc = parser.parseFromString(aContents, "text/xml");
+    let node = doc.querySelector("elem[id='entity']");
+
+    return node ? node.textContent : null;
+  }
+""")
+
+registry.register('l10n.get_localized_property', """
+  function (aUrls, aId) {
+    let property = null;
+
+    aUrls.some(aUrl => {
+      let bundle = Services.strings.createBundle(aUrl);
+
+      try {
+        property = bundle.GetStringFromName(aId);
+        return true;
+      }
+      catch (ex) { }
+    });
+
+    return property;
+  }
+""")
 
 
 class L10n(BaseLib):
@@ -19,39 +50,14 @@ class L10n(BaseLib):
         :param dtd_urls: A list of dtd files to search.
         :param entity_id: The id to retrieve the value from.
 
-        :returns: The localized string for the requested entity.
+        :returns: The localized string for the requested entity, or a
+         :class:`~helpers.Deferred` inside of a :func:`~Puppeteer.batch`.
 
         :raises MarionetteException: When entity id is not found in dtd_urls.
         """
-        # Add xhtml11.dtd to prevent missing entity errors with XHTML files
-        dtds = copy.copy(dtd_urls)
-        dtds.append("resource:///res/dtd/xhtml11.dtd")
-
-        dtd_refs = ''
-        for index, item in enumerate(dtds):
-            dtd_id = 'dtd_%s' % index
-            dtd_refs += '<!ENTITY %% %s SYSTEM "%s">%%%s;' % \
-                (dtd_id, item, dtd_id)
-
-        contents = """<?xml version="1.0"?>
-            <!DOCTYPE elem [%s]>
-
-            <elem id="entity">&%s;</elem>""" % (dtd_refs, entity_id)
-
-        with self.marionette.using_context('chrome'):
-            value = self.marionette.execute_script("""
-                var parser = Cc["@mozilla.org/xmlextras/domparser;1"]
-                              .createInstance(Ci.nsIDOMParser);
-                var doc = parser.parseFromString(arguments[0], "text/xml");
-                var node = doc.querySelector("elem[id='entity']");
-
-                return node ? node.textContent : null;
-            """, script_args=[contents])
-
-        if not value:
-            raise MarionetteException('DTD Entity not found: %s' % entity_id)
-
-        return value
+        return registry.defer(self.marionette, 'l10n.get_localized_entity',
+                              [self._get_entity_document(dtd_urls, entity_id)],
+                              transform=self._check_entity(entity_id))
 
     def get_localized_property(self, property_urls, property_id):
         """Returns the localized string for the specified property id.
@@ -62,31 +68,58 @@ class L10n(BaseLib):
         :param property_urls: A list of property files to search.
         :param property_id: The id to retrieve the value from.
 
-        :returns: The localized string for the requested entity.
+        :returns: The localized string for the requested entity, or a
+         :class:`~helpers.Deferred` inside of a :func:`~Puppeteer.batch`.
 
         :raises MarionetteException: When property id is not found in
             property_urls.
         """
+        return registry.defer(self.marionette, 'l10n.get_localized_property',
+                              [property_urls, property_id],
+                              transform=self._check_property(property_id))
+
+    def _get_localized_entity(self, dtd_urls, entity_id):
+        # Library internals need the value, even inside of a batch
+        value = registry.call(self.marionette, 'l10n.get_localized_entity',
+                              self._get_entity_document(dtd_urls, entity_id))
+        return self._check_entity(entity_id)(value)
+
+    def _get_localized_property(self, property_urls, property_id):
+        value = registry.call(self.marionette, 'l10n.get_localized_property',
+                              property_urls, property_id)
+        return self._check_property(property_id)(value)
+
+    @staticmethod
+    def _check_entity(entity_id):
+        def check(value):
+            if not value:
+                raise MarionetteException('DTD Entity not found: %s' % entity_id)
+            return value
+
+        return check
+
+    @staticmethod
+    def _check_property(property_id):
+        def check(value):
+            if not value:
+                raise MarionetteException('Property not found: %s' % property_id)
+            return value
+
+        return check
+
+    @staticmethod
+    def _get_entity_document(dtd_urls, entity_id):
+        # Add xhtml11.dtd to prevent missing entity errors with XHTML files
+        dtds = copy.copy(dtd_urls)
+        dtds.append("resource:///res/dtd/xhtml11.dtd")
 
-        with self.marionette.using_context('chrome'):
-            value = self.marionette.execute_script("""
-                let property = null;
-                let property_id = arguments[1];
-
-                arguments[0].some(aUrl => {
-                  let bundle = Services.strings.createBundle(aUrl);
-
-                  try {
-                    property = bundle.GetStringFromName(property_id);
-                    return true;
-                  }
-                  catch (ex) { }
-                });
-
-                return property;
-            """, script_args=[property_urls, property_id])
+        dtd_refs = ''
+        for index, item in enumerate(dtds):
+            dtd_id = 'dtd_%s' % index
+            dtd_refs += '<!ENTITY %% %s SYSTEM "%s">%%%s;' % \
+                (dtd_id, item, dtd_id)
 
-        if not value:
-            raise MarionetteException('Property not found: %s' % property_id)
+        return """<?xml version="1.0"?>
+            <!DOCTYPE elem [%s]>
 
-        return value
+            <elem id="entity">&%s;</elem>""" % (dtd_refs, entity_id)
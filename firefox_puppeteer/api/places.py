@@ -0,0 +1,120 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import calendar
+import datetime
+
+from marionette.errors import MarionetteException
+
+from ..base import BaseLib
+
+
+class Places(BaseLib):
+    """Low-level access to the Places database of Firefox.
+
+    All operations are executed as a single asynchronous chrome script, so
+    even large amounts of history can be seeded or removed with one command.
+    """
+
+    # Transition type used for inserted visits (TRANSITION_LINK)
+    TRANSITION_LINK = 1
+
+    def add_visits(self, visits, timeout=None):
+        """Inserts history visits into the Places database.
+
+        Each entry of `visits` can either be a URL string, or a dict with the
+        keys `url`, and optionally `title` and `visit_date`. The visit date
+        can be given as :class:`datetime.datetime` (UTC) or as microseconds
+        since the epoch, and defaults to the current time.
+
+        All visits are inserted via `PlacesUtils.asyncHistory.updatePlaces()`
+        in a single chrome script.
+
+        :param visits: List of URLs or visit dicts to insert.
+        :param timeout: Optional, script timeout in milliseconds. Defaults to
+         the Marionette script timeout.
+
+        :returns: The number of places which have been inserted.
+
+        :raises MarionetteException: When any of the visits failed to insert.
+        """
+        places = [self._create_place_info(visit) for visit in visits]
+        if not places:
+            return 0
+
+        with self.marionette.using_context('chrome'):
+            result = self.marionette.execute_async_script("""
+              Cu.import("resource://gre/modules/PlacesUtils.jsm");
+
+              let places = arguments[0].map(place => {
+                return {
+                  uri: Services.io.newURI(place.url, null, null),
+                  title: place.title,
+                  visits: [{
+                    transitionType: place.transition,
+                    visitDate: place.visit_date
+                  }]
+                };
+              });
+
+              let result = {inserted: 0, errors: []};
+              PlacesUtils.asyncHistory.updatePlaces(places, {
+                handleError: function (aResultCode, aPlaceInfo) {
+                  result.errors.push(aPlaceInfo.uri.spec);
+                },
+                handleResult: function (aPlaceInfo) {
+                  result.inserted++;
+                },
+                handleCompletion: function () {
+                  marionetteScriptFinished(result);
+                }
+              });
+            """, script_args=[places], script_timeout=timeout)
+
+        if result['errors']:
+            raise MarionetteException('Failed to add %s history visits: %s' %
+                                      (len(result['errors']), result['errors'][:5]))
+
+        return result['inserted']
+
+    def remove_all_history(self, timeout=None):
+        """Removes all history visits from the Places database.
+
+        The method returns after Places has notified the end of the
+        expiration process.
+
+        :param timeout: Optional, script timeout in milliseconds. Defaults to
+         the Marionette script timeout.
+        """
+        with self.marionette.using_context('chrome'):
+            self.marionette.execute_async_script("""
+              Cu.import("resource://gre/modules/PlacesUtils.jsm");
+
+              let topic = "places-expiration-finished";
+              let observer = {
+                observe: function (aSubject, aTopic, aData) {
+                  Services.obs.removeObserver(observer, topic);
+                  marionetteScriptFinished(true);
+                }
+              };
+
+              Services.obs.addObserver(observer, topic, false);
+              PlacesUtils.bhistory.removeAllPages();
+            """, script_timeout=timeout)
+
+    def _create_place_info(self, visit):
+        if isinstance(visit, basestring):
+            visit = {'url': visit}
+
+        visit_date = visit.get('visit_date') or datetime.datetime.utcnow()
+        if isinstance(visit_date, datetime.datetime):
+            seconds = calendar.timegm(visit_date.utctimetuple())
+            visit_date = seconds * 1000000 + visit_date.microsecond
+
+        return {
+            'url': visit['url'],
+            'title': visit.get('title'),
+            'transition': visit.get('transition', self.TRANSITION_LINK),
+            'visit_date': int(visit_date),
+        }
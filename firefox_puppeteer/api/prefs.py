@@ -5,6 +5,93 @@
 from marionette.errors import MarionetteException
 
 from ..base import BaseLib
+from ..helpers import registry
+
+
+registry.register('prefs.get_pref', """
+  function (aName, aDefaultBranch, aInterface) {
+    let prefBranch;
+    if (aDefaultBranch) {
+      prefBranch = Services.prefs.getDefaultBranch("");
+    }
+    else {
+      prefBranch = Services.prefs;
+    }
+
+    // If an interface has been set, handle it differently
+    if (aInterface !== null) {
+      return prefBranch.getComplexValue(aName, Ci[aInterface]).data;
+    }
+
+    let type = prefBranch.getPrefType(aName);
+
+    switch (type) {
+      case prefBranch.PREF_STRING:
+        return prefBranch.getCharPref(aName);
+      case prefBranch.PREF_BOOL:
+        return prefBranch.getBoolPref(aName);
+      case prefBranch.PREF_INT:
+        return prefBranch.getIntPref(aName);
+      case prefBranch.PREF_INVALID:
+        return null;
+    }
+  }
+""")
+
+registry.register('prefs.reset_pref', """
+  function (aName) {
+    let prefBranch = Services.prefs;
+
+    if (prefBranch.prefHasUserValue(aName)) {
+      prefBranch.clearUserPref(aName);
+      return true;
+    }
+    else {
+      return false;
+    }
+  }
+""")
+
+registry.register('prefs.set_pref', """
+  function (aName, aValue) {
+    let prefBranch = Services.prefs;
+
+    let type = prefBranch.getPrefType(aName);
+
+    // If the pref does not exist yet, get the type from the value
+    if (type == prefBranch.PREF_INVALID) {
+      switch (typeof aValue) {
+        case "boolean":
+          type = prefBranch.PREF_BOOL;
+          break;
+        case "number":
+          type = prefBranch.PREF_INT;
+          break;
+        case "string":
+          type = prefBranch.PREF_STRING;
+          break;
+        default:
+          type = prefBranch.PREF_INVALID;
+      }
+    }
+
+    switch (type) {
+      case prefBranch.PREF_BOOL:
+        prefBranch.setBoolPref(aName, aValue);
+        break;
+      case prefBranch.PREF_STRING:
+        prefBranch.setCharPref(aName, aValue);
+        break;
+      case prefBranch.PREF_INT:
+        prefBranch.setIntPref(aName, aValue);
+        break;
+      default:
+        return false;
+    }
+
+    return true;
+  }
+""")
 
 
 class Preferences(BaseLib):
@@ -29,45 +116,13 @@ class Preferences(BaseLib):
          default to `None`. Possible values are: `nsILocalFile`,
          `nsISupportsString`, and `nsIPrefLocalizedString`
 
-        :returns: The preference value.
+        :returns: The preference value, or a :class:`~helpers.Deferred`
+         inside of a :func:`~Puppeteer.batch`.
         """
         assert pref_name is not None
 
-        with self.marionette.using_context('chrome'):
-            return self.marionette.execute_script("""
-              Cu.import("resource://gre/modules/Services.jsm");
-
-              let pref_name = arguments[0];
-              let default_branch = arguments[1];
-              let interface = arguments[2];
-
-              let prefBranch;
-              if (default_branch) {
-                prefBranch = Services.prefs.getDefaultBranch("");
-              }
-              else {
-                prefBranch = Services.prefs;
-              }
-
-              // If an interface has been set, handle it differently
-              if (interface !== null) {
-                return prefBranch.getComplexValue(pref_name,
-                                                  Ci[interface]).data;
-              }
-
-              let type = prefBranch.getPrefType(pref_name);
-
-              switch (type) {
-                case prefBranch.PREF_STRING:
-                  return prefBranch.getCharPref(pref_name);
-                case prefBranch.PREF_BOOL:
-                  return prefBranch.getBoolPref(pref_name);
-                case prefBranch.PREF_INT:
-                  return prefBranch.getIntPref(pref_name);
-                case prefBranch.PREF_INVALID:
-                  return null;
-              }
-            """, script_args=[pref_name, default_branch, interface])
+        return registry.defer(self.marionette, 'prefs.get_pref',
+                              [pref_name, default_branch, interface])
 
     def reset_pref(self, pref_name):
         """Resets a user set preference.
@@ -82,25 +137,12 @@ class Preferences(BaseLib):
 
         :param pref_name: The preference to reset
 
-        :returns: `True` if a user preference has been removed
+        :returns: `True` if a user preference has been removed, or a
+         :class:`~helpers.Deferred` inside of a :func:`~Puppeteer.batch`.
         """
         assert pref_name is not None
 
-        with self.marionette.using_context('chrome'):
-            return self.marionette.execute_script("""
-              Cu.import("resource://gre/modules/Services.jsm");
-              let prefBranch = Services.prefs;
-
-              let pref_name = arguments[0];
-
-              if (prefBranch.prefHasUserValue(pref_name)) {
-                prefBranch.clearUserPref(pref_name);
-                return true;
-              }
-              else {
-                return false;
-              }
-            """, script_args=[pref_name])
+        return registry.defer(self.marionette, 'prefs.reset_pref', [pref_name])
 
     def restore_all_prefs(self):
         """Restores all previously modified preferences to their former values.
@@ -129,9 +171,9 @@ class Preferences(BaseLib):
             # in case it is a newly set preference, reset it. Otherwise restore
             # its original value.
             if self.archive[pref_name] is None:
-                self.reset_pref(pref_name)
+                registry.call(self.marionette, 'prefs.reset_pref', pref_name)
             else:
-                self.set_pref(pref_name, self.archive[pref_name])
+                self._set_pref(pref_name, self.archive[pref_name])
 
             del self.archive[pref_name]
         except KeyError:
@@ -153,52 +195,16 @@ class Preferences(BaseLib):
         assert pref_name is not None
         assert value is not None
 
-        with self.marionette.using_context('chrome'):
-            # Backup original value only once
-            if pref_name not in self.archive:
-                self.archive[pref_name] = self.get_pref(pref_name)
-
-            retval = self.marionette.execute_script("""
-              Cu.import("resource://gre/modules/Services.jsm");
-              let prefBranch = Services.prefs;
-
-              let pref_name = arguments[0];
-              let value = arguments[1];
-
-              let type = prefBranch.getPrefType(pref_name);
-
-              // If the pref does not exist yet, get the type from the value
-              if (type == prefBranch.PREF_INVALID) {
-                switch (typeof value) {
-                  case "boolean":
-                    type = prefBranch.PREF_BOOL;
-                    break;
-                  case "number":
-                    type = prefBranch.PREF_INT;
-                    break;
-                  case "string":
-                    type = prefBranch.PREF_STRING;
-                    break;
-                  default:
-                    type = prefBranch.PREF_INVALID;
-                }
-              }
-
-              switch (type) {
-                case prefBranch.PREF_BOOL:
-                  prefBranch.setBoolPref(pref_name, value);
-                  break;
-                case prefBranch.PREF_STRING:
-                  prefBranch.setCharPref(pref_name, value);
-                  break;
-                case prefBranch.PREF_INT:
-                  prefBranch.setIntPref(pref_name, value);
-                  break;
-                default:
-                  return false;
-              }
-
-              return true;
-            """, script_args=[pref_name, value])
-
-        assert retval
+        # Backup original value only once. The archive has to be filled right
+        # away, so a restore inside of a batch finds the value.
+        if pref_name not in self.archive:
+            self.archive[pref_name] = registry.call(self.marionette, 'prefs.get_pref',
+                                                    pref_name, False, None)
+
+        def check(retval):
+            assert retval
+
+        registry.defer(self.marionette, 'prefs.set_pref', [pref_name, value], transform=check)
+
+    def _set_pref(self, pref_name, value):
+        assert registry.call(self.marionette, 'prefs.set_pref', pref_name, value)
@@ -0,0 +1,111 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from marionette.errors import MarionetteException
+
+from ..base import BaseLib
+
+
+class Sanitizer(BaseLib):
+    """Clears browser data like history, cookies, or the cache."""
+
+    categories = (
+        'cache',
+        'cookies',
+        'downloads',
+        'formdata',
+        'history',
+        'permissions',
+        'sessions',
+    )
+
+    def clear(self, categories=None, timeout=None):
+        """Clears the data stores of the given categories.
+
+        All data stores are cleared in parallel by a single chrome script,
+        which returns once all of them have been finished.
+
+        :param categories: Optional, list of categories to clear. See
+         :attr:`categories` for possible values. Defaults to all categories.
+        :param timeout: Optional, script timeout in milliseconds. Defaults to
+         the Marionette script timeout.
+
+        :raises ValueError: When an unknown category has been specified.
+        :raises MarionetteException: When any of the data stores could not be
+         cleared.
+        """
+        if categories is None:
+            categories = self.categories
+
+        unknown = set(categories) - set(self.categories)
+        if unknown:
+            raise ValueError('Unknown categories: %s' % ', '.join(sorted(unknown)))
+
+        with self.marionette.using_context('chrome'):
+            errors = self.marionette.execute_async_script("""
+              Cu.import("resource://gre/modules/Downloads.jsm");
+              Cu.import("resource://gre/modules/FormHistory.jsm");
+              Cu.import("resource://gre/modules/PlacesUtils.jsm");
+
+              let cleaners = {
+                cache: function () {
+                  Services.cache2.clear();
+                },
+
+                cookies: function () {
+                  Services.cookies.removeAll();
+                },
+
+                downloads: function () {
+                  return Downloads.getList(Downloads.ALL).then(list => {
+                    list.removeFinished();
+                  });
+                },
+
+                formdata: function () {
+                  return new Promise((resolve, reject) => {
+                    FormHistory.update({op: "remove"}, {
+                      handleError: aError => reject(aError.message),
+                      handleCompletion: aReason => resolve()
+                    });
+                  });
+                },
+
+                history: function () {
+                  return new Promise(resolve => {
+                    let topic = "places-expiration-finished";
+                    let observer = {
+                      observe: function (aSubject, aTopic, aData) {
+                        Services.obs.removeObserver(observer, topic);
+                        resolve();
+                      }
+                    };
+
+                    Services.obs.addObserver(observer, topic, false);
+                    PlacesUtils.bhistory.removeAllPages();
+                  });
+                },
+
+                permissions: function () {
+                  Services.perms.removeAll();
+                },
+
+                sessions: function () {
+                  Services.obs.notifyObservers(null, "browser:purge-session-history", "");
+                }
+              };
+
+              let errors = {};
+              let promises = arguments[0].map(category => {
+                return new Promise(resolve => resolve(cleaners[category]()))
+                  .catch(aError => { errors[category] = aError.toString(); });
+              });
+
+              Promise.all(promises).then(() => marionetteScriptFinished(errors));
+            """, script_args=[list(categories)], script_timeout=timeout)
+
+        if errors:
+            raise MarionetteException('Failed to clear browser data: %s' %
+                                      ', '.join('%s (%s)' % (category, error)
+                                                for category, error in errors.items()))
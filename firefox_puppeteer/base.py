@@ -2,6 +2,11 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this file,
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
+from functools import wraps
+
+from marionette import HTMLElement
+from marionette.errors import StaleElementException
+
 from . import errors
 
 
@@ -14,6 +19,14 @@ class BaseLib(object):
 
         self._marionette = None
         self._marionette_getter = marionette_getter
+        self._element_cache = None
+
+    @property
+    def element_cache(self):
+        """The :class:`ElementCache` used for static elements of the library."""
+        if self._element_cache is None:
+            self._element_cache = ElementCache(self.get_marionette)
+        return self._element_cache
 
     @property
     def marionette(self):
@@ -38,6 +51,109 @@ class UIBaseLib(BaseLib):
                                                    window)
         self._window = window
 
+    @property
+    def element_cache(self):
+        """The :class:`ElementCache` shared by all libraries of the window."""
+        return self.window.element_cache
+
     @property
     def window(self):
         return self._window
+
+
+class ElementCache(object):
+    """Caches references of elements which live as long as their chrome window.
+
+    Elements like the urlbar or the back button never change during the
+    lifetime of a browser window, so it is not necessary to find them again
+    for each access. Cached references are checked for a changed Marionette
+    session only, which does not need any command. Whenever a command on a
+    cached element fails with a `StaleElementException`, the element is found
+    again and the command gets retried.
+    """
+
+    # Statistics of all element caches
+    totals = {'hits': 0, 'misses': 0, 'refinds': 0}
+
+    def __init__(self, marionette_getter):
+        self._marionette_getter = marionette_getter
+        self._elements = {}
+
+        self.stats = {'hits': 0, 'misses': 0, 'refinds': 0}
+
+    def clear(self):
+        """Removes all cached element references."""
+        self._elements = {}
+
+    def find_element(self, method, target):
+        """Returns the cached element for the given locator.
+
+        If the element is not cached yet, it gets found in the current chrome
+        window via `find_element`.
+
+        :param method: The locator method, e.g. `id`.
+        :param target: The locator target, e.g. `urlbar`.
+
+        :returns: :class:`CachedElement` instance
+        """
+        marionette = self._marionette_getter()
+
+        entry = self._elements.get((method, target))
+        if entry is not None and entry[0] == marionette.session_id:
+            self._count('hits')
+            return entry[1]
+
+        self._count('misses')
+        element = CachedElement(self, method, target,
+                                marionette.find_element(method, target))
+        self._elements[(method, target)] = (marionette.session_id, element)
+
+        return element
+
+    def _count(self, name):
+        self.stats[name] += 1
+        ElementCache.totals[name] += 1
+
+    def _refind(self, element):
+        self._count('refinds')
+        marionette = self._marionette_getter()
+        element.id = marionette.find_element(element._method, element._target).id
+
+
+class CachedElement(HTMLElement):
+    """An element returned by :class:`ElementCache`.
+
+    Each method, which fails because the element is stale, gets retried once
+    after the element has been found again.
+    """
+
+    def __init__(self, cache, method, target, element):
+        HTMLElement.__init__(self, element.marionette, element.id)
+
+        self._cache = cache
+        self._method = method
+        self._target = target
+
+    def __getattribute__(self, name):
+        if name.startswith('_') or name in ('id', 'marionette'):
+            return object.__getattribute__(self, name)
+
+        try:
+            value = object.__getattribute__(self, name)
+        except StaleElementException:
+            # Properties like `text` send a command when accessed
+            self._cache._refind(self)
+            return object.__getattribute__(self, name)
+
+        if not callable(value):
+            return value
+
+        @wraps(value)
+        def retry_if_stale(*args, **kwargs):
+            try:
+                return value(*args, **kwargs)
+            except StaleElementException:
+                self._cache._refind(self)
+                return object.__getattribute__(self, name)(*args, **kwargs)
+
+        return retry_if_stale
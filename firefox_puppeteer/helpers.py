@@ -0,0 +1,328 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import hashlib
+import json
+
+from marionette.errors import JavascriptException
+
+from . import errors
+
+
+_CALL_SCRIPT = """
+  if (typeof Services == "undefined") {
+    return {content: true};
+  }
+
+  let [version, calls] = arguments;
+  let registry = Services._puppeteerHelpers;
+  if (!registry || registry.version != version) {
+    return {missing: true};
+  }
+
+  let results = calls.map(([name, args]) => {
+    try {
+      return {value: registry.functions[name].apply(window, args)};
+    }
+    catch (e) {
+      return {error: e.toString()};
+    }
+  });
+
+  return {value: results};
+"""
+
+
+class Batch(object):
+    """Queues helper calls, and executes them with a single chrome script.
+
+    Use :func:`~firefox_puppeteer.Puppeteer.batch` to create a batch. All
+    deferrable library calls made while the batch is active return a
+    :class:`Deferred` instead of their value. The queued calls are executed in
+    order when the `with` block exits, or when :func:`flush` gets called.
+
+    Calls which are not deferrable, and all other Marionette commands, are
+    still executed immediately.
+
+    :param registry: The :class:`HelperRegistry` to use.
+    :param marionette: The Marionette instance to use.
+    """
+
+    def __init__(self, registry, marionette):
+        self.registry = registry
+        self.marionette = marionette
+
+        self.results = []
+        self._queue = []
+
+    def __enter__(self):
+        self.registry._batches[self.marionette] = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        del self.registry._batches[self.marionette]
+
+        # Do not execute queued calls if the batch itself failed
+        if exc_type is not None:
+            self._queue = []
+            return
+
+        self.flush()
+
+        failed = [result for result in self.results if result.error]
+        if failed:
+            raise errors.BatchError('%s of %s batched calls failed: %s' %
+                                    (len(failed), len(self.results),
+                                     ', '.join('%s (%s)' % (result.name, result.error)
+                                               for result in failed)))
+
+    def add(self, name, args, transform=None):
+        """Queues a helper call.
+
+        :param name: The name of the helper function.
+        :param args: The list of arguments to call the function with.
+        :param transform: Optional, callable which gets the return value of
+         the helper function, and returns the final value.
+
+        :returns: The :class:`Deferred` result of the call.
+        """
+        result = Deferred(name, args, transform)
+        self._queue.append(result)
+        self.results.append(result)
+
+        return result
+
+    def flush(self):
+        """Executes all queued calls with a single chrome script."""
+        queue, self._queue = self._queue, []
+        if not queue:
+            return
+
+        values = self.registry._execute(self.marionette,
+                                        [[result.name, result.args] for result in queue])
+        for result, value in zip(queue, values):
+            if 'error' in value:
+                result._set_error(JavascriptException(value['error']))
+            else:
+                result._set_value(value.get('value'))
+
+
+class Deferred(object):
+    """The result of a helper call queued by a :class:`Batch`.
+
+    :param name: The name of the helper function.
+    :param args: The list of arguments to call the function with.
+    :param transform: Optional, callable which gets the return value of the
+     helper function, and returns the final value.
+    """
+
+    def __init__(self, name, args, transform=None):
+        self.name = name
+        self.args = args
+        self.done = False
+        self.error = None
+
+        self._transform = transform
+        self._value = None
+
+    def __repr__(self):
+        return '<Deferred %s%s>' % (self.name, ' (done)' if self.done else '')
+
+    @property
+    def value(self):
+        """The final value of the call.
+
+        :raises BatchError: When the batch has not been executed yet.
+        :raises Exception: The error of the call, if it has failed.
+        """
+        if not self.done:
+            raise errors.BatchError('Batched call "%s" has not been executed yet' % self.name)
+        if self.error:
+            raise self.error
+
+        return self._value
+
+    def _set_error(self, error):
+        self.done = True
+        self.error = error
+
+    def _set_value(self, value):
+        try:
+            if self._transform:
+                value = self._transform(value)
+            self._value = value
+        except Exception as e:
+            self.error = e
+        self.done = True
+
+
+class HelperRegistry(object):
+    """Registry of chrome helper functions, which are called by name.
+
+    Libraries register the JavaScript sources of their helper functions once
+    at import time. The first call of a helper installs all registered
+    functions into a privileged sandbox of the browser, and stores them in a
+    registry attached to the `Services` module. Later calls only send the name
+    of the function and its arguments, so the browser does not have to compile
+    the source again.
+
+    If the registry gets lost, e.g. after a restart of the browser, or if new
+    helpers have been registered, all helpers are installed again.
+
+    Helper functions are called with the current chrome window as `this`, and
+    have access to `Cc`, `Ci`, `Cu`, `Cr`, and `Services`.
+    """
+
+    def __init__(self):
+        self._batches = {}
+        self._sources = {}
+        self._version = None
+
+        # Statistics about calls and installations
+        self.stats = {'calls': 0, 'installs': 0}
+
+    @property
+    def version(self):
+        """A checksum of all registered helper sources."""
+        if self._version is None:
+            data = json.dumps(sorted(self._sources.items()))
+            self._version = hashlib.md5(data.encode('utf-8')).hexdigest()
+        return self._version
+
+    def batch(self, marionette):
+        """Creates a :class:`Batch` of deferred helper calls.
+
+        If a batch is already active for the Marionette instance, the calls
+        are added to it, and executed when the outer batch exits.
+
+        :param marionette: The Marionette instance to use.
+
+        :returns: The :class:`Batch` instance to be used as context manager.
+        """
+        if marionette in self._batches:
+            return _NestedBatch(self._batches[marionette])
+
+        return Batch(self, marionette)
+
+    def call(self, marionette, name, *args):
+        """Calls the helper function with the given arguments.
+
+        The function is executed in chrome scope. If the current context is
+        the content scope, it gets temporarily switched to chrome.
+
+        Calls queued by an active batch are executed first, so the order of
+        all calls is kept.
+
+        :param marionette: The Marionette instance to use.
+        :param name: The name of the helper function.
+        :param args: The arguments to call the function with.
+
+        :returns: The return value of the helper function.
+
+        :raises JavascriptException: When the helper function has thrown.
+        """
+        if name not in self._sources:
+            raise KeyError('Unknown chrome helper: "%s"' % name)
+
+        if marionette in self._batches:
+            self._batches[marionette].flush()
+
+        result = self._execute(marionette, [[name, list(args)]])[0]
+        if 'error' in result:
+            raise JavascriptException(result['error'])
+
+        return result.get('value')
+
+    def defer(self, marionette, name, args, transform=None):
+        """Calls the helper function, or queues the call if a batch is active.
+
+        :param marionette: The Marionette instance to use.
+        :param name: The name of the helper function.
+        :param args: The list of arguments to call the function with.
+        :param transform: Optional, callable which gets the return value of
+         the helper function, and returns the final value.
+
+        :returns: The final value, or a :class:`Deferred` if a batch is active.
+        """
+        if name not in self._sources:
+            raise KeyError('Unknown chrome helper: "%s"' % name)
+
+        if marionette in self._batches:
+            return self._batches[marionette].add(name, list(args), transform)
+
+        value = self.call(marionette, name, *args)
+        return transform(value) if transform else value
+
+    def install(self, marionette):
+        """Installs all registered helper functions in the browser.
+
+        :param marionette: The Marionette instance to use.
+        """
+        self.stats['installs'] += 1
+
+        with marionette.using_context('chrome'):
+            marionette.execute_script("""
+              let [version, sources] = arguments;
+
+              let sandbox = Cu.Sandbox(Services.scriptSecurityManager.getSystemPrincipal(),
+                                       {sandboxName: "firefox-puppeteer helpers"});
+              Cu.evalInSandbox("var {classes: Cc, interfaces: Ci," +
+                               "     utils: Cu, results: Cr} = Components;" +
+                               "Cu.import('resource://gre/modules/Services.jsm');", sandbox);
+
+              let functions = {};
+              for (let name in sources) {
+                functions[name] = Cu.evalInSandbox("(" + sources[name] + ")", sandbox,
+                                                   "1.8", "puppeteer:" + name, 1);
+              }
+
+              Services._puppeteerHelpers = {version: version, functions: functions};
+            """, script_args=[self.version, self._sources])
+
+    def register(self, name, source):
+        """Registers a helper function.
+
+        :param name: The name of the helper function, prefixed by the name of
+         the library, e.g. `prefs.get_pref`.
+        :param source: The JavaScript source of the function expression, e.g.
+         `function (aName) { ... }`.
+        """
+        self._sources[name] = source.strip()
+        self._version = None
+
+    def _execute(self, marionette, calls):
+        self.stats['calls'] += len(calls)
+
+        result = self._execute_script(marionette, calls)
+        if result.get('content'):
+            with marionette.using_context('chrome'):
+                result = self._execute_script(marionette, calls)
+
+        return result['value']
+
+    def _execute_script(self, marionette, calls):
+        script_args = [self.version, calls]
+
+        result = marionette.execute_script(_CALL_SCRIPT, script_args=script_args)
+        if result.get('missing'):
+            self.install(marionette)
+            result = marionette.execute_script(_CALL_SCRIPT, script_args=script_args)
+
+        return result
+
+
+class _NestedBatch(object):
+    """Adds the calls of a nested `with` block to the outer batch."""
+
+    def __init__(self, batch):
+        self.batch = batch
+
+    def __enter__(self):
+        return self.batch
+
+    def __exit__(self, exc_type, exc_value, tb):
+        pass
+
+
+registry = HelperRegistry()
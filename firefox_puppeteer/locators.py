@@ -0,0 +1,124 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from marionette.errors import NoSuchElementException
+
+
+class LocatorPath(object):
+    """A chain of locator steps which gets resolved by a single chrome script.
+
+    Elements inside anonymous content can often only be reached by a chain of
+    `find_element` calls, which costs one command per step. A locator path
+    declares such a chain once, and resolves it with a single command.
+
+    Each step is a tuple of a strategy and a value. Supported strategies are:
+
+    * `id`: The element with the given id, searched in the document for the
+      first step, and inside the current element otherwise.
+    * `anon attribute`: The anonymous element of the current element with the
+      given attribute, e.g. `{'anonid': 'input'}`.
+    * `tag name`: The descendant elements of the current element with the
+      given tag name. If used before the last step, the first match is used.
+
+    Example::
+
+        urlbar_input = LocatorPath(('id', 'urlbar'),
+                                   ('anon attribute', {'anonid': 'input'}))
+        element = urlbar_input.find_element(marionette)
+
+    :param steps: The locator steps as `(strategy, value)` tuples.
+    """
+
+    strategies = ('anon attribute', 'id', 'tag name')
+
+    def __init__(self, *steps):
+        if not steps:
+            raise ValueError('A locator path needs at least one step')
+
+        for strategy, value in steps:
+            if strategy not in self.strategies:
+                raise ValueError('Unsupported locator strategy: "%s"' % strategy)
+            if strategy == 'anon attribute' and len(value) != 1:
+                raise ValueError('Anonymous locators need exactly one attribute: %s' % value)
+
+        self.steps = steps
+
+    def __repr__(self):
+        return '<LocatorPath %s>' % ' > '.join('%s=%s' % step for step in self.steps)
+
+    def find_element(self, marionette, root=None):
+        """Resolves the locator path to a single element.
+
+        :param marionette: The Marionette instance to use.
+        :param root: Optional, the element to start the search from. Defaults
+         to the document of the current chrome window.
+
+        :returns: The element found by the last step.
+
+        :raises NoSuchElementException: When any of the steps does not match.
+        """
+        return self._resolve(marionette, root, False)
+
+    def find_elements(self, marionette, root=None):
+        """Resolves the locator path to all elements matched by the last step.
+
+        :param marionette: The Marionette instance to use.
+        :param root: Optional, the element to start the search from. Defaults
+         to the document of the current chrome window.
+
+        :returns: List of elements found by the last step.
+
+        :raises NoSuchElementException: When any step but the last one does
+         not match.
+        """
+        return self._resolve(marionette, root, True)
+
+    def _resolve(self, marionette, root, multiple):
+        steps = [[strategy, value] for strategy, value in self.steps]
+
+        result = marionette.execute_script("""
+          let [root, steps, multiple] = arguments;
+          let doc = root ? root.ownerDocument : document;
+
+          let node = root;
+          for (let i = 0; i < steps.length; i++) {
+            let [strategy, value] = steps[i];
+            let last = (i == steps.length - 1);
+            let matches = [];
+
+            switch (strategy) {
+              case "id":
+                let selector = "[id='" + value.replace(/'/g, "\\\\'") + "']";
+                let match = node ? node.querySelector(selector) : doc.getElementById(value);
+                matches = match ? [match] : [];
+                break;
+              case "anon attribute":
+                let name = Object.keys(value)[0];
+                let anon = doc.getAnonymousElementByAttribute(node, name, value[name]);
+                matches = anon ? [anon] : [];
+                break;
+              case "tag name":
+                matches = Array.slice((node || doc).getElementsByTagName(value));
+                break;
+            }
+
+            if (last && multiple) {
+              return {elements: matches};
+            }
+            if (!matches.length) {
+              return {failed: i};
+            }
+
+            node = matches[0];
+          }
+
+          return {elements: [node]};
+        """, script_args=[root, steps, multiple])
+
+        if 'failed' in result:
+            strategy, value = self.steps[result['failed']]
+            raise NoSuchElementException('Unable to locate element with %s "%s" (step %s of %r)' %
+                                         (strategy, value, result['failed'] + 1, self))
+
+        return result['elements'] if multiple else result['elements'][0]
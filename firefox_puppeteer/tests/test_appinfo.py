@@ -0,0 +1,30 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from firefox_puppeteer.helpers import registry
+from firefox_ui_harness.testcase import FirefoxTestCase
+
+
+class TestAppInfo(FirefoxTestCase):
+
+    def test_properties(self):
+        self.assertEqual(self.appinfo.name, 'Firefox')
+        self.assertIsInstance(self.appinfo.appBuildID, basestring)
+        self.assertIsInstance(self.appinfo.browserTabsRemoteAutostart, bool)
+        self.assertIsInstance(self.appinfo.locale, basestring)
+        self.assertIn(self.appinfo.OS, ('Darwin', 'Linux', 'WINNT'))
+        self.assertGreater(self.appinfo.processorCount, 0)
+        self.assertIsInstance(self.appinfo.version, basestring)
+
+        # Members without a dedicated property
+        self.assertIsInstance(self.appinfo.XPCOMABI, basestring)
+        self.assertRaises(AttributeError, getattr, self.appinfo, 'unknownProperty')
+
+    def test_snapshot_cached(self):
+        self.appinfo.version
+        calls = registry.stats['calls']
+
+        self.assertEqual(self.appinfo.sysinfo['cpucount'], self.appinfo.processorCount)
+        self.appinfo.appBuildID
+        self.assertEqual(registry.stats['calls'], calls)
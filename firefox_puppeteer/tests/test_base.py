@@ -0,0 +1,65 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from firefox_ui_harness.testcase import FirefoxTestCase
+
+
+class TestElementCache(FirefoxTestCase):
+
+    def setUp(self):
+        FirefoxTestCase.setUp(self)
+
+        self.cache = self.browser.element_cache
+        self.cache.clear()
+
+    def tearDown(self):
+        try:
+            self.marionette.execute_script("""
+              let element = document.getElementById("puppeteer-cache-test");
+              if (element) {
+                element.parentNode.removeChild(element);
+              }
+            """)
+        finally:
+            FirefoxTestCase.tearDown(self)
+
+    def create_element(self):
+        self.marionette.execute_script("""
+          let element = document.getElementById("puppeteer-cache-test");
+          if (element) {
+            element.parentNode.removeChild(element);
+          }
+
+          element = document.createElement("label");
+          element.id = "puppeteer-cache-test";
+          element.setAttribute("value", "test");
+          document.documentElement.appendChild(element);
+        """)
+
+    def test_cached_lookups(self):
+        hits = self.cache.stats['hits']
+        misses = self.cache.stats['misses']
+
+        back_button = self.browser.navbar.back_button
+        self.assertEqual(self.browser.navbar.back_button, back_button)
+        self.assertEqual(back_button.get_attribute('localName'), 'toolbarbutton')
+
+        self.assertEqual(self.cache.stats['misses'], misses + 1)
+        self.assertEqual(self.cache.stats['hits'], hits + 1)
+
+        # All libraries of a window share the same cache
+        self.assertIs(self.browser.tabbar.element_cache, self.cache)
+        self.assertIs(self.browser.menubar.element_cache, self.cache)
+        self.assertIs(self.browser.navbar.locationbar.identity_popup.element_cache, self.cache)
+
+    def test_stale_element(self):
+        self.create_element()
+        element = self.cache.find_element('id', 'puppeteer-cache-test')
+        self.assertEqual(element.get_attribute('value'), 'test')
+
+        # Replace the element so the cached reference becomes stale
+        self.create_element()
+        refinds = self.cache.stats['refinds']
+        self.assertEqual(element.get_attribute('value'), 'test')
+        self.assertEqual(self.cache.stats['refinds'], refinds + 1)
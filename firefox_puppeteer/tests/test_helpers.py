@@ -0,0 +1,118 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from marionette.errors import MarionetteException
+
+from firefox_puppeteer import errors
+from firefox_puppeteer.helpers import HelperRegistry, registry
+from firefox_ui_harness.testcase import FirefoxTestCase
+
+
+class TestHelperRegistry(FirefoxTestCase):
+
+    def setUp(self):
+        FirefoxTestCase.setUp(self)
+
+        # A separate registry keeps the test helpers out of the shared one.
+        # Installing it replaces the shared helpers, which then get installed
+        # again on their next call.
+        self.registry = HelperRegistry()
+        self.registry.register('tests.add', 'function (a, b) { return a + b; }')
+
+    def test_call(self):
+        self.assertEqual(self.registry.call(self.marionette, 'tests.add', 1, 2), 3)
+
+        # Calls from content scope are executed in chrome scope
+        with self.marionette.using_context('content'):
+            self.assertEqual(self.registry.call(self.marionette, 'tests.add', 'a', 'b'), 'ab')
+
+        self.assertRaises(KeyError, self.registry.call, self.marionette, 'tests.unknown')
+
+    def test_install_once(self):
+        self.registry.call(self.marionette, 'tests.add', 1, 2)
+        self.assertEqual(self.registry.stats['installs'], 1)
+
+        self.registry.call(self.marionette, 'tests.add', 1, 2)
+        self.assertEqual(self.registry.stats['installs'], 1)
+
+        # Registering a new helper installs all of them again
+        self.registry.register('tests.sub', 'function (a, b) { return a - b; }')
+        self.assertEqual(self.registry.call(self.marionette, 'tests.sub', 3, 2), 1)
+        self.assertEqual(self.registry.stats['installs'], 2)
+
+    def test_reinstall_lost_registry(self):
+        self.registry.call(self.marionette, 'tests.add', 1, 2)
+        self.assertEqual(self.registry.stats['installs'], 1)
+
+        # Simulate the loss of the registry, e.g. by a restart of the browser
+        self.marionette.execute_script('delete Services._puppeteerHelpers;')
+        self.assertEqual(self.registry.call(self.marionette, 'tests.add', 1, 2), 3)
+        self.assertEqual(self.registry.stats['installs'], 2)
+
+
+class TestBatch(FirefoxTestCase):
+
+    def tearDown(self):
+        try:
+            self.prefs.restore_all_prefs()
+        finally:
+            FirefoxTestCase.tearDown(self)
+
+    def test_batch(self):
+        pref_name = 'marionette.unittest.batch'
+
+        calls = registry.stats['calls']
+        with self.batch() as batch:
+            self.prefs.set_pref(pref_name, 'foo')
+            value = self.prefs.get_pref(pref_name)
+            label = self.browser.get_localized_entity('helpSafeMode.label')
+
+            self.assertFalse(value.done)
+            self.assertRaises(errors.BatchError, lambda: value.value)
+
+        # The original value gets archived immediately
+        self.assertEqual(len(batch.results), 3)
+        self.assertEqual(registry.stats['calls'], calls + 4)
+
+        self.assertEqual(value.value, 'foo')
+        self.assertEqual(self.prefs.archive[pref_name], None)
+
+        menu_item = self.marionette.find_element('id', 'helpSafeMode')
+        self.assertEqual(label.value, menu_item.get_attribute('label'))
+
+    def test_errors(self):
+        try:
+            with self.batch():
+                value = self.prefs.get_pref('browser.tabs.warnOnClose')
+                label = self.browser.get_localized_entity('notExistent')
+            self.fail('BatchError has not been raised')
+        except errors.BatchError as e:
+            self.assertIn('l10n.get_localized_entity', e.message)
+
+        self.assertIsInstance(value.value, bool)
+        self.assertRaises(MarionetteException, lambda: label.value)
+
+    def test_immediate_calls(self):
+        pref_name = 'marionette.unittest.batch'
+
+        with self.batch():
+            self.prefs.set_pref(pref_name, 'foo')
+
+            # Non deferrable calls flush the queue first
+            self.assertIsNotNone(self.windows.focused_chrome_window_handle)
+            self.assertEqual(registry.call(self.marionette, 'prefs.get_pref',
+                                           pref_name, False, None), 'foo')
+
+    def test_library_internals(self):
+        pref_name = 'marionette.unittest.batch'
+
+        with self.batch():
+            self.prefs.set_pref(pref_name, 'foo')
+            self.prefs.restore_pref(pref_name)
+
+            # Shortcuts need the localized key right away
+            tab = self.browser.tabbar.open_tab(trigger='shortcut')
+            tab.close(trigger='shortcut')
+
+        self.assertIsNone(self.prefs.get_pref(pref_name))
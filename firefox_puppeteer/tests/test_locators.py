@@ -0,0 +1,44 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from marionette.errors import NoSuchElementException
+
+from firefox_puppeteer.locators import LocatorPath
+from firefox_ui_harness.testcase import FirefoxTestCase
+
+
+class TestLocatorPath(FirefoxTestCase):
+
+    def test_find_element(self):
+        path = LocatorPath(('id', 'urlbar'), ('anon attribute', {'anonid': 'input'}))
+        expected = (self.marionette.find_element('id', 'urlbar')
+                                   .find_element('anon attribute', {'anonid': 'input'}))
+        self.assertEqual(path.find_element(self.marionette), expected)
+
+        # Search relative to an element
+        urlbar = self.marionette.find_element('id', 'urlbar')
+        path = LocatorPath(('anon attribute', {'anonid': 'input'}))
+        self.assertEqual(path.find_element(self.marionette, urlbar), expected)
+
+    def test_find_elements(self):
+        path = LocatorPath(('id', 'main-menubar'), ('tag name', 'menu'))
+        expected = (self.marionette.find_element('id', 'main-menubar')
+                                   .find_elements('tag name', 'menu'))
+        self.assertEqual(path.find_elements(self.marionette), expected)
+
+        path = LocatorPath(('id', 'main-menubar'), ('tag name', 'notexistent'))
+        self.assertEqual(path.find_elements(self.marionette), [])
+
+    def test_not_found(self):
+        path = LocatorPath(('id', 'notexistent'), ('anon attribute', {'anonid': 'input'}))
+        self.assertRaises(NoSuchElementException, path.find_element, self.marionette)
+        self.assertRaises(NoSuchElementException, path.find_elements, self.marionette)
+
+        path = LocatorPath(('id', 'urlbar'), ('anon attribute', {'anonid': 'notexistent'}))
+        self.assertRaises(NoSuchElementException, path.find_element, self.marionette)
+
+    def test_invalid_steps(self):
+        self.assertRaises(ValueError, LocatorPath)
+        self.assertRaises(ValueError, LocatorPath, ('xpath', '//menu'))
+        self.assertRaises(ValueError, LocatorPath, ('anon attribute', {'a': 'b', 'c': 'd'}))
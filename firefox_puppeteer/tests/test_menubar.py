@@ -4,6 +4,7 @@
 
 from marionette.errors import NoSuchElementException
 
+from firefox_puppeteer import DOMElement
 from firefox_ui_harness.testcase import FirefoxTestCase
 
 
@@ -19,6 +20,12 @@ class TestMenuBar(FirefoxTestCase):
         self.assertEquals(len(self.browser.tabbar.tabs), num_tabs + 1)
         self.browser.tabbar.tabs[-1].close()
 
+    def test_select_by_id(self):
+        num_tabs = len(self.browser.tabbar.tabs)
+        self.browser.menubar.select_by_id('menu_newNavigatorTab')
+        self.assertEquals(len(self.browser.tabbar.tabs), num_tabs + 1)
+        self.browser.tabbar.tabs[-1].close()
+
     def test_click_non_existent_menu_and_item(self):
         with self.assertRaises(NoSuchElementException):
             # Hard-coded labels will not work in localized builds
@@ -27,3 +34,34 @@ class TestMenuBar(FirefoxTestCase):
         with self.assertRaises(NoSuchElementException):
             # Hard-coded labels will not work in localized builds
             self.browser.menubar.select('File', 'Foobar')
+
+    def test_get_attributes(self):
+        menus = self.browser.menubar.menus
+        values = DOMElement.get_attributes(menus, ['id', 'label', 'notexistent'])
+
+        self.assertEqual(len(values), len(menus))
+        for menu, value in zip(menus, values):
+            self.assertEqual(value['id'], menu.get_attribute('id'))
+            self.assertEqual(value['label'], menu.get_attribute('label'))
+            self.assertIsNone(value['notexistent'])
+
+        self.assertEqual(DOMElement.get_attributes([], ['label']), [])
+
+    def test_menu_index_after_mutation(self):
+        menubar = self.browser.menubar
+        file_menu = menubar.get_menu('File')
+
+        # The index is cached as long as the menubar does not change
+        self.assertEqual(menubar.get_menu('File'), file_menu)
+
+        self.marionette.execute_script("""
+          arguments[0].setAttribute('label', 'Foobar');
+        """, script_args=[file_menu])
+        try:
+            self.assertEqual(menubar.get_menu('Foobar'), file_menu)
+            with self.assertRaises(NoSuchElementException):
+                menubar.get_menu('File')
+        finally:
+            self.marionette.execute_script("""
+              arguments[0].setAttribute('label', 'File');
+            """, script_args=[file_menu])
@@ -0,0 +1,54 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import datetime
+
+from firefox_ui_harness.testcase import FirefoxTestCase
+
+
+class TestPlaces(FirefoxTestCase):
+
+    def setUp(self):
+        FirefoxTestCase.setUp(self)
+        self.places.remove_all_history()
+
+    def tearDown(self):
+        try:
+            self.places.remove_all_history()
+        finally:
+            FirefoxTestCase.tearDown(self)
+
+    def get_history_count(self):
+        return self.marionette.execute_script("""
+          Cu.import("resource://gre/modules/PlacesUtils.jsm");
+
+          let options = PlacesUtils.history.getNewQueryOptions();
+          let query = PlacesUtils.history.getNewQuery();
+          let root = PlacesUtils.history.executeQuery(query, options).root;
+
+          root.containerOpen = true;
+          let count = root.childCount;
+          root.containerOpen = false;
+
+          return count;
+        """)
+
+    def test_add_visits(self):
+        self.assertEqual(self.places.add_visits([]), 0)
+
+        visits = ['http://example.org/string']
+        visits.extend({'url': 'http://example.org/%s' % i,
+                       'title': 'Title %s' % i,
+                       'visit_date': datetime.datetime(2015, 1, 1, 12, i % 60),
+                       } for i in range(0, 500))
+
+        self.assertEqual(self.places.add_visits(visits), len(visits))
+        self.assertEqual(self.get_history_count(), len(visits))
+
+    def test_remove_all_history(self):
+        self.places.add_visits(['http://example.org/%s' % i for i in range(0, 10)])
+        self.assertEqual(self.get_history_count(), 10)
+
+        self.places.remove_all_history()
+        self.assertEqual(self.get_history_count(), 0)
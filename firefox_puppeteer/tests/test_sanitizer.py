@@ -0,0 +1,57 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from firefox_ui_harness.testcase import FirefoxTestCase
+
+
+class TestSanitizer(FirefoxTestCase):
+
+    def setUp(self):
+        FirefoxTestCase.setUp(self)
+
+        self.url = 'http://example.org/'
+
+    def get_permission_count(self):
+        return self.marionette.execute_script("""
+          let count = 0;
+          let permissions = Services.perms.enumerator;
+          while (permissions.hasMoreElements()) {
+            permissions.getNext();
+            count++;
+          }
+          return count;
+        """)
+
+    def test_clear(self):
+        self.places.add_visits([self.url])
+        self.marionette.execute_script("""
+          let uri = Services.io.newURI(arguments[0], null, null);
+          Services.perms.add(uri, "popup", Services.perms.ALLOW_ACTION);
+        """, script_args=[self.url])
+        self.assertNotEqual(self.get_permission_count(), 0)
+
+        self.sanitizer.clear(['history', 'permissions'])
+        self.assertEqual(self.get_permission_count(), 0)
+
+        # Clearing all categories at once has to work too
+        self.sanitizer.clear()
+
+        self.assertRaises(ValueError, self.sanitizer.clear, ['unknown'])
+
+    def test_reset_state(self):
+        pref_name = 'browser.tabs.maxOpenBeforeWarn'
+        orig_value = self.prefs.get_pref(pref_name)
+        self.prefs.set_pref(pref_name, 99999)
+
+        self.browser.tabbar.open_tab()
+        self.browser.open_browser()
+        self.assertEqual(len(self.marionette.chrome_window_handles), 2)
+
+        window = self.reset_state(['history'], window=self.browser)
+
+        self.assertEqual(window, self.browser)
+        self.assertEqual(window.handle, self.marionette.current_chrome_window_handle)
+        self.assertEqual(len(self.marionette.chrome_window_handles), 1)
+        self.assertEqual(len(window.tabbar.tabs), 1)
+        self.assertEqual(self.prefs.get_pref(pref_name), orig_value)
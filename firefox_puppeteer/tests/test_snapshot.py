@@ -0,0 +1,57 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+import tempfile
+
+from firefox_puppeteer.ui.snapshot import SnapshotNode
+from firefox_ui_harness.testcase import FirefoxTestCase
+
+
+class TestSnapshot(FirefoxTestCase):
+
+    def test_snapshot(self):
+        snapshot = self.browser.snapshot()
+
+        self.assertEqual(snapshot.tag, 'window')
+        self.assertEqual(snapshot.id, 'main-window')
+
+        urlbar = snapshot.find('#urlbar')
+        self.assertEqual(urlbar.tag, 'textbox')
+        self.assertFalse(urlbar.anonymous)
+
+        # Anonymous content is included
+        urlbar_input = urlbar.find('[anonid=input]')
+        self.assertTrue(urlbar_input.anonymous)
+        self.assertIn('urlbar-input', urlbar_input.classes)
+
+        menus = snapshot.find_all('#main-menubar > menu')
+        expected = (self.marionette.find_element('id', 'main-menubar')
+                                   .find_elements('tag name', 'menu'))
+        self.assertEqual(len(menus), len(expected))
+        self.assertEqual([menu.get_attribute('label') for menu in menus],
+                         [menu.get_attribute('label') for menu in expected])
+
+        self.assertIsNone(snapshot.find('#notexistent'))
+        self.assertRaises(ValueError, snapshot.find_all, 'menu:hover')
+
+    def test_snapshot_options(self):
+        snapshot = self.browser.snapshot(attributes=['label'], anonymous=False)
+
+        file_menu = snapshot.find('#file-menu')
+        self.assertEqual(sorted(file_menu.attributes.keys()), ['id', 'label'])
+        self.assertIsNone(snapshot.find('#urlbar [anonid=input]'))
+
+    def test_save_load(self):
+        snapshot = self.browser.snapshot()
+
+        fd, filename = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            snapshot.save(filename)
+            loaded = SnapshotNode.load(filename)
+        finally:
+            os.remove(filename)
+
+        self.assertEqual(loaded.to_dict(), snapshot.to_dict())
@@ -157,3 +157,24 @@ class TestTab(FirefoxTestCase):
         self.assertFalse(tabbar.tabs[1].selected)
 
         new_tab.close()
+
+    def test_set_session_history(self):
+        tab = self.browser.tabbar.tabs[0]
+        urls = [self.marionette.absolute_url('layout/mozilla.html'),
+                self.marionette.absolute_url('layout/mozilla_mission.html'),
+                {'url': self.marionette.absolute_url('layout/mozilla_grants.html'),
+                 'title': 'Grants'},
+                ]
+
+        tab.set_session_history(urls, index=1)
+
+        history_count = self.marionette.execute_script("""
+          return gBrowser.sessionHistory.count;
+        """)
+        self.assertEqual(history_count, 3)
+
+        with self.marionette.using_context('content'):
+            self.assertEqual(self.marionette.get_url(), urls[1])
+
+        self.assertRaises(ValueError, tab.set_session_history, [])
+        self.assertRaises(IndexError, tab.set_session_history, urls, 3)
@@ -45,6 +45,15 @@ class TestLocationBar(FirefoxTestCase):
         contextmenu = self.browser.navbar.locationbar.contextmenu
         self.assertEqual('menupopup', contextmenu.get_attribute('localName'))
 
+    def test_open_close_contextmenu(self):
+        locationbar = self.browser.navbar.locationbar
+
+        locationbar.open_context_menu()
+        self.assertEqual(locationbar.contextmenu.state, 'open')
+
+        locationbar.close_context_menu()
+        self.assertEqual(locationbar.contextmenu.state, 'closed')
+
     def test_contextment_entry(self):
         contextmenu_entry = self.browser.navbar.locationbar.get_contextmenu_entry('paste')
         self.assertEqual('cmd_paste', contextmenu_entry.get_attribute('cmd'))
@@ -70,6 +79,23 @@ class TestLocationBar(FirefoxTestCase):
         self.assertEqual('toolbarbutton', stop_button.get_attribute('localName'))
 
 
+class TestIdentityPopup(FirefoxTestCase):
+
+    def test_state(self):
+        identity_popup = self.browser.navbar.locationbar.identity_popup
+        state = identity_popup.state()
+
+        self.assertEqual(state['is_open'], identity_popup.is_open)
+        self.assertEqual(state['box_class'], identity_popup.box.get_attribute('className'))
+        self.assertEqual(state['country_label'],
+                         identity_popup.country_label.get_attribute('value'))
+        self.assertEqual(state['organization_label'],
+                         identity_popup.organization_label.get_attribute('value'))
+
+        for name in ('encryption_label', 'host', 'owner', 'owner_location', 'verifier'):
+            self.assertIn(name, state)
+
+
 class TestAutoCompleteResults(FirefoxTestCase):
     def setUp(self):
         FirefoxTestCase.setUp(self)
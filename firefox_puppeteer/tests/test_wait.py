@@ -0,0 +1,103 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from marionette.errors import TimeoutException
+
+from firefox_puppeteer.wait import Wait, wait_for_attribute
+from firefox_ui_harness.testcase import FirefoxTestCase
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+        self.sleeps = []
+
+    def sleep(self, duration):
+        self.sleeps.append(duration)
+        self.now += duration
+
+
+class TestWait(FirefoxTestCase):
+
+    def setUp(self):
+        FirefoxTestCase.setUp(self)
+
+        self.clock = FakeClock()
+
+    def test_adaptive_interval(self):
+        polls = iter([False, False, False, False, True])
+        wait = Wait(self.marionette, timeout=5, clock=self.clock,
+                    min_interval=0.01, max_interval=0.03, backoff=2)
+
+        self.assertTrue(wait.until(lambda _: next(polls)))
+        self.assertEqual(self.clock.sleeps, [0.01, 0.02, 0.03, 0.03])
+
+    def test_fixed_interval(self):
+        polls = iter([False, False, True])
+        wait = Wait(self.marionette, timeout=5, interval=0.5, clock=self.clock)
+
+        self.assertTrue(wait.until(lambda _: next(polls)))
+        self.assertEqual(self.clock.sleeps, [0.5, 0.5])
+
+    def test_stats(self):
+        wait = Wait(self.marionette, timeout=1, clock=self.clock)
+
+        wait.until(lambda _: True)
+        call_site = [site for site in Wait.stats if 'test_stats' in site][0]
+        self.assertEqual(Wait.stats[call_site].calls, 1)
+        self.assertEqual(Wait.stats[call_site].polls, 1)
+        self.assertEqual(Wait.stats[call_site].histogram[0], 1)
+
+        with self.assertRaises(TimeoutException):
+            wait.until(lambda _: False)
+        timeout_site = [site for site in Wait.stats
+                        if 'test_stats' in site and site != call_site][0]
+        self.assertEqual(Wait.stats[timeout_site].timeouts, 1)
+
+        self.assertIn(call_site, [entry['call_site'] for entry in Wait.report()])
+
+
+class TestWaitForAttribute(FirefoxTestCase):
+
+    def setUp(self):
+        FirefoxTestCase.setUp(self)
+
+        self.element = self.marionette.find_element('id', 'urlbar')
+
+    def tearDown(self):
+        try:
+            self.marionette.execute_script("""
+              arguments[0].removeAttribute('puppeteer-test');
+            """, script_args=[self.element])
+        finally:
+            FirefoxTestCase.tearDown(self)
+
+    def set_attribute_delayed(self, value):
+        self.marionette.execute_script("""
+          let [element, value] = arguments;
+          window.setTimeout(() => element.setAttribute('puppeteer-test', value), 100);
+        """, script_args=[self.element, value])
+
+    def test_value(self):
+        self.set_attribute_delayed('foo')
+        self.assertEqual(wait_for_attribute(self.element, 'puppeteer-test', value='foo'), 'foo')
+
+    def test_predicate(self):
+        self.assertIsNone(wait_for_attribute(self.element, 'puppeteer-test',
+                                             predicate='value === null'))
+
+        self.set_attribute_delayed('foobar')
+        self.assertEqual(wait_for_attribute(self.element, 'puppeteer-test',
+                                            predicate='value && value.startsWith("foo")'),
+                         'foobar')
+
+    def test_property(self):
+        self.assertEqual(wait_for_attribute(self.element, 'localName', value='textbox',
+                                            as_property=True), 'textbox')
+
+    def test_timeout(self):
+        self.assertRaises(TimeoutException, wait_for_attribute, self.element,
+                          'puppeteer-test', value='foo', timeout=0.5)
+        self.assertRaises(ValueError, wait_for_attribute, self.element, 'puppeteer-test')
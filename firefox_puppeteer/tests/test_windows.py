@@ -2,6 +2,9 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import os
+import tempfile
+
 from marionette import By
 from marionette.errors import NoSuchWindowException
 
@@ -198,3 +201,33 @@ class TestWindows(FirefoxTestCase):
         win2 = self.browser.open_browser()
         self.assertEquals(win2, self.windows.current)
         win2.close(force=True)
+
+    def test_browser_state(self):
+        orig_state = self.windows.get_browser_state()
+        self.assertEqual(len(orig_state['windows']), 1)
+
+        win2 = self.browser.open_browser()
+        win2.tabbar.open_tab()
+
+        fd, filename = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            state = self.windows.save_browser_state(filename)
+            self.assertEqual(len(state['windows']), 2)
+
+            win2.close()
+            self.browser.switch_to()
+
+            windows = self.windows.restore_browser_state(filename=filename)
+            self.assertEqual(len(windows), 2)
+            self.assertEqual(len(self.marionette.chrome_window_handles), 2)
+            self.assertEqual(windows[0].handle, self.marionette.current_chrome_window_handle)
+            self.assertEqual(sorted(len(win.tabbar.tabs) for win in windows), [1, 2])
+        finally:
+            os.remove(filename)
+
+        windows = self.windows.restore_browser_state(orig_state)
+        self.assertEqual(len(windows), 1)
+        self.browser = windows[0]
+
+        self.assertRaises(ValueError, self.windows.restore_browser_state)
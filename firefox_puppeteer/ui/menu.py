@@ -3,25 +3,30 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+from marionette import HTMLElement
 from marionette.errors import NoSuchElementException
 
-from ..base import BaseLib
-from .. import DOMElement
+from ..base import UIBaseLib
+from .. import DOMElement, ElementIndex
 
 
-class MenuBar(BaseLib):
+class MenuBar(UIBaseLib):
     """
     Class for manipulating the Firefox menubar.
     """
 
+    def __init__(self, *args, **kwargs):
+        UIBaseLib.__init__(self, *args, **kwargs)
+        self._menu_index = None
+
     @property
     def menus(self):
         """
         :returns: A list of :class:`MenuElement`'s corresponding to the top
                   level menus in the menubar.
         """
-        menus = (self.marionette.find_element('id', 'main-menubar')
-                                .find_elements('tag name', 'menu'))
+        menus = (self.element_cache.find_element('id', 'main-menubar')
+                                   .find_elements('tag name', 'menu'))
         return [self.MenuElement(menu) for menu in menus]
 
     def get_menu(self, label):
@@ -31,13 +36,19 @@ class MenuBar(BaseLib):
         :param label: The label of the menu, e.g 'File' or 'View'
         :returns: A MenuElement
         """
-        menu = [m for m in self.menus if m.get_attribute('label') == label]
+        if self._menu_index is None:
+            menubar = self.element_cache.find_element('id', 'main-menubar')
+            self._menu_index = ElementIndex(menubar,
+                                            lambda: menubar.find_elements('tag name', 'menu'),
+                                            'label', self.MenuElement)
+
+        menu = self._menu_index.get(label)
 
-        if not menu:
+        if menu is None:
             raise NoSuchElementException('Could not find a menu with '
                                          'label "{}"'.format(label))
 
-        return menu[0]
+        return menu
 
     def select(self, label, item):
         """
@@ -48,18 +59,36 @@ class MenuBar(BaseLib):
         """
         return self.get_menu(label).select(item)
 
+    def select_by_id(self, item_id):
+        """
+        Select an item in a menu by its id.
+
+        This is independent from the locale of the application.
+
+        :param item_id: The id of the menuitem, e.g 'menu_newNavigatorTab'
+        """
+        item = self.element_cache.find_element('id', item_id)
+        MenuPopup.activate(item)
+
     class MenuElement(DOMElement):
         """
         Wraps a menu element.
         """
+        _item_index = None
 
         @property
         def items(self):
             """
             :returns: A list of menuitem elements within this menu.
             """
-            return (self.find_element('tag name', 'menupopup')
-                        .find_elements('tag name', 'menuitem'))
+            return self.popup.find_elements('tag name', 'menuitem')
+
+        @property
+        def popup(self):
+            """
+            :returns: The :class:`MenuPopup` of this menu.
+            """
+            return MenuPopup(self.find_element('tag name', 'menupopup'))
 
         def select(self, label):
             """
@@ -67,11 +96,193 @@ class MenuBar(BaseLib):
 
             :param label: The label of the menuitem, e.g 'New Tab'
             """
-            item = [l for l in self.items if l.get_attribute('label') == label]
+            if self._item_index is None:
+                self._item_index = ElementIndex(self, lambda: self.items, 'label')
 
-            if not item:
+            item = self._item_index.get(label)
+
+            if item is None:
                 message = ("Item labeled '{}' not found in the '{}' menu"
                            .format(label, self.get_attribute('label')))
                 raise NoSuchElementException(message)
 
-            return item[0].click()
+            MenuPopup.activate(item)
+
+
+class MenuPopup(DOMElement):
+    """
+    Wraps a menupopup element, e.g. of a menu or a context menu.
+
+    Opening and closing the popup, and activating its items is done by a single
+    asynchronous script each, which returns once the popup has been shown or
+    hidden.
+    """
+    _item_index = None
+
+    @property
+    def state(self):
+        """
+        :returns: The state of the popup, one of `closed`, `showing`, `open`
+         or `hiding`.
+        """
+        return self.marionette.execute_script("""
+          return arguments[0].state;
+        """, script_args=[self])
+
+    def close(self, timeout=None):
+        """
+        Closes the popup and waits until it has been hidden.
+
+        :param timeout: Optional, script timeout in milliseconds. Defaults to
+         the Marionette script timeout.
+        """
+        self.marionette.execute_async_script("""
+          let popup = arguments[0];
+
+          if (popup.state == "closed") {
+            marionetteScriptFinished(true);
+            return;
+          }
+
+          popup.addEventListener("popuphidden", function onHidden(aEvent) {
+            if (aEvent.target == popup) {
+              popup.removeEventListener("popuphidden", onHidden);
+              marionetteScriptFinished(true);
+            }
+          });
+
+          popup.hidePopup();
+        """, script_args=[self], script_timeout=timeout)
+
+    def open(self, anchor=None, timeout=None):
+        """
+        Opens the popup and waits until it has been shown.
+
+        Popups of menus are opened by their parent menu. All other popups are
+        opened as context menu of the `anchor` element.
+
+        :param anchor: Optional, the element to anchor the popup to.
+        :param timeout: Optional, script timeout in milliseconds. Defaults to
+         the Marionette script timeout.
+        """
+        self.marionette.execute_async_script("""
+          let [popup, anchor] = arguments;
+
+          if (popup.state == "open") {
+            marionetteScriptFinished(true);
+            return;
+          }
+
+          popup.addEventListener("popupshown", function onShown(aEvent) {
+            if (aEvent.target == popup) {
+              popup.removeEventListener("popupshown", onShown);
+              marionetteScriptFinished(true);
+            }
+          });
+
+          if (!anchor && popup.parentNode.localName == "menu") {
+            popup.parentNode.open = true;
+          } else {
+            popup.openPopup(anchor, "after_start", 0, 0, true, false);
+          }
+        """, script_args=[self, anchor], script_timeout=timeout)
+
+    def select(self, item, timeout=None):
+        """
+        Activates a menuitem of the popup.
+
+        :param item: The menuitem element, or its label.
+        :param timeout: Optional, script timeout in milliseconds. Defaults to
+         the Marionette script timeout.
+        """
+        if not isinstance(item, HTMLElement):
+            if self._item_index is None:
+                self._item_index = ElementIndex(
+                    self, lambda: self.find_elements('tag name', 'menuitem'), 'label')
+
+            label = item
+            item = self._item_index.get(label)
+            if item is None:
+                raise NoSuchElementException('Item labeled "{}" not found in '
+                                             'the popup'.format(label))
+
+        MenuPopup.activate(item, timeout)
+
+    @staticmethod
+    def activate(item, timeout=None):
+        """
+        Activates a menuitem inside a menupopup.
+
+        The popup gets opened first, and once it has been shown the command of
+        the item is dispatched. Afterward the popup is closed, and the method
+        returns once it has been hidden.
+
+        Popups of the native menubar on OS X, and of a hidden menubar cannot be
+        shown. For those the command is dispatched directly.
+
+        :param item: The menuitem element.
+        :param timeout: Optional, script timeout in milliseconds. Defaults to
+         the Marionette script timeout.
+        """
+        item.marionette.execute_async_script("""
+          let item = arguments[0];
+          let popup = item.parentNode;
+          let menu = popup.parentNode;
+          let win = item.ownerDocument.defaultView;
+
+          let inMenuBar = false;
+          let toolbar = null;
+          for (let node = menu; node; node = node.parentNode) {
+            inMenuBar = inMenuBar || node.id == "main-menubar";
+            if (node.id == "toolbar-menubar") {
+              toolbar = node;
+            }
+          }
+
+          // An autohidden menubar is inactive, and collapses in height
+          let hidden = menu.localName == "menu" &&
+                       ((toolbar && toolbar.getAttribute("autohide") == "true" &&
+                         toolbar.getAttribute("inactive") == "true") ||
+                        menu.getBoundingClientRect().height == 0);
+
+          if ((inMenuBar && Services.appinfo.OS == "Darwin") || hidden) {
+            item.doCommand();
+            marionetteScriptFinished(true);
+            return;
+          }
+
+          popup.addEventListener("popuphidden", function onHidden(aEvent) {
+            if (aEvent.target == popup) {
+              popup.removeEventListener("popuphidden", onHidden);
+              marionetteScriptFinished(true);
+            }
+          });
+
+          function activate() {
+            item.doCommand();
+
+            // The command might have closed the window
+            if (win.closed) {
+              marionetteScriptFinished(true);
+            } else {
+              popup.hidePopup();
+            }
+          }
+
+          if (popup.state == "open") {
+            activate();
+          } else {
+            popup.addEventListener("popupshown", function onShown(aEvent) {
+              if (aEvent.target == popup) {
+                popup.removeEventListener("popupshown", onShown);
+                activate();
+              }
+            });
+
+            if (menu.localName == "menu") {
+              menu.open = true;
+            } else {
+              popup.openPopup(null, "after_start", 0, 0, true, false);
+            }
+          }
+        """, script_args=[item], script_timeout=timeout)
@@ -0,0 +1,251 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import re
+
+
+class SnapshotNode(object):
+    """A node of a DOM snapshot taken by :func:`~ui.windows.BaseWindow.snapshot`.
+
+    The node represents an element of the chrome window at the time the
+    snapshot was taken. All properties and queries are evaluated locally, so
+    they do not send any command to Marionette.
+
+    :param data: The serialized data of the node and its children.
+    :param parent: Optional, the parent :class:`SnapshotNode`.
+    """
+
+    def __init__(self, data, parent=None):
+        self.tag = data['tag']
+        self.attributes = data.get('attributes', {})
+        self.anonymous = data.get('anonymous', False)
+        self.text = data.get('text', '')
+        self.parent = parent
+        self.children = [SnapshotNode(child, self) for child in data.get('children', [])]
+
+    def __repr__(self):
+        node_id = ' id="%s"' % self.id if self.id else ''
+        return '<SnapshotNode %s%s>' % (self.tag, node_id)
+
+    @property
+    def classes(self):
+        """The list of CSS classes of the node.
+
+        :returns: List of class names
+        """
+        return self.attributes.get('class', '').split()
+
+    @property
+    def id(self):
+        """The id of the node.
+
+        :returns: The id, or `None` if the node has no id
+        """
+        return self.attributes.get('id')
+
+    def find(self, selector):
+        """Returns the first descendant node which matches the CSS selector.
+
+        See :func:`find_all` for the supported subset of CSS selectors.
+
+        :param selector: The CSS selector.
+
+        :returns: The :class:`SnapshotNode`, or `None` if no node matches.
+        """
+        for node in self.find_all(selector):
+            return node
+        return None
+
+    def find_all(self, selector):
+        """Returns all descendant nodes which match the CSS selector.
+
+        The supported subset of CSS selectors consists of type selectors, the
+        universal selector, id and class selectors, attribute selectors with
+        the operators `=`, `~=`, `^=`, `$=` and `*=`, the descendant and child
+        combinators, and selector groups.
+
+        :param selector: The CSS selector.
+
+        :returns: List of :class:`SnapshotNode` instances in document order.
+        """
+        groups = Selector.parse(selector)
+        return [node for node in self.iter_descendants()
+                if any(group.matches(node) for group in groups)]
+
+    def get_attribute(self, name):
+        """Returns the value of an attribute of the node.
+
+        :param name: The name of the attribute.
+
+        :returns: The value, or `None` if the attribute has not been captured.
+        """
+        return self.attributes.get(name)
+
+    def iter_descendants(self):
+        """Iterates over all descendant nodes in document order."""
+        for child in self.children:
+            yield child
+            for node in child.iter_descendants():
+                yield node
+
+    def save(self, filename):
+        """Saves the node and all its descendants as JSON file.
+
+        :param filename: Name of the file to write to.
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    def to_dict(self):
+        """Returns the serializable data of the node and all its descendants."""
+        return {
+            'tag': self.tag,
+            'attributes': self.attributes,
+            'anonymous': self.anonymous,
+            'text': self.text,
+            'children': [child.to_dict() for child in self.children],
+        }
+
+    @classmethod
+    def load(cls, filename):
+        """Loads a snapshot from a JSON file as written by :func:`save`.
+
+        :param filename: Name of the file to read from.
+
+        :returns: The root :class:`SnapshotNode`.
+        """
+        with open(filename) as f:
+            return cls(json.load(f))
+
+
+class Selector(object):
+    """A compiled complex CSS selector, e.g. `toolbar > toolbarbutton.foo`.
+
+    :param compounds: List of `(combinator, compound)` tuples, whereby the
+     combinator links the compound to the previous one.
+    """
+
+    _token = re.compile(r"""
+        \s*(?P<combinator>[>,])\s* |
+        (?P<space>\s+) |
+        (?P<tag>[\w-]+|\*) |
+        \#(?P<id>[\w-]+) |
+        \.(?P<cls>[\w-]+) |
+        \[\s*(?P<attr>[\w:-]+)\s*
+            (?:(?P<op>[~^$*]?=)\s*
+               (?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\]\s]+))\s*)?\]
+        """, re.VERBOSE)
+
+    def __init__(self, compounds):
+        self.compounds = compounds
+
+    @classmethod
+    def parse(cls, selector):
+        """Parses a CSS selector into a list of selector groups.
+
+        :param selector: The CSS selector.
+
+        :returns: List of :class:`Selector` instances, one per group.
+
+        :raises ValueError: When the selector is invalid or not supported.
+        """
+        groups = []
+        compounds = []
+        compound = []
+        combinator = ' '
+
+        position = 0
+        selector = selector.strip()
+        while position < len(selector):
+            match = cls._token.match(selector, position)
+            if not match or match.end() == position:
+                raise ValueError('Unsupported selector "%s" at position %s' %
+                                 (selector, position))
+            position = match.end()
+
+            if match.group('combinator') or match.group('space'):
+                if not compound:
+                    raise ValueError('Invalid selector "%s"' % selector)
+                compounds.append((combinator, compound))
+                compound = []
+                combinator = match.group('combinator') or ' '
+
+                if combinator == ',':
+                    groups.append(cls(compounds))
+                    compounds = []
+                    combinator = ' '
+
+            elif match.group('tag'):
+                compound.append(('tag', match.group('tag')))
+            elif match.group('id'):
+                compound.append(('=', 'id', match.group('id')))
+            elif match.group('cls'):
+                compound.append(('~=', 'class', match.group('cls')))
+            else:
+                value = match.group('dq')
+                if value is None:
+                    value = match.group('sq')
+                if value is None:
+                    value = match.group('bare')
+                compound.append((match.group('op') or 'has', match.group('attr'), value))
+
+        if not compound:
+            raise ValueError('Invalid selector "%s"' % selector)
+        compounds.append((combinator, compound))
+        groups.append(cls(compounds))
+
+        return groups
+
+    def matches(self, node):
+        """Checks if the node matches the selector.
+
+        :param node: The :class:`SnapshotNode` to check.
+
+        :returns: `True` if the node matches.
+        """
+        return self._matches(node, len(self.compounds) - 1)
+
+    def _matches(self, node, index):
+        combinator, compound = self.compounds[index]
+        if not self._matches_compound(node, compound):
+            return False
+        if index == 0:
+            return True
+
+        parent = node.parent
+        while parent is not None:
+            if self._matches(parent, index - 1):
+                return True
+            if combinator == '>':
+                return False
+            parent = parent.parent
+
+        return False
+
+    @staticmethod
+    def _matches_compound(node, compound):
+        for condition in compound:
+            if condition[0] == 'tag':
+                if condition[1] not in ('*', node.tag):
+                    return False
+                continue
+
+            operator, name, expected = condition
+            value = node.attributes.get(name)
+            if value is None:
+                return False
+
+            if operator == '=' and value != expected:
+                return False
+            elif operator == '~=' and expected not in value.split():
+                return False
+            elif operator == '^=' and not value.startswith(expected):
+                return False
+            elif operator == '$=' and not value.endswith(expected):
+                return False
+            elif operator == '*=' and expected not in value:
+                return False
+
+        return True
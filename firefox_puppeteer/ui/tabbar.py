@@ -2,21 +2,38 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this file,
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
-from marionette import (
-    Wait,
-)
-
 from marionette.errors import NoSuchElementException
 
 import firefox_puppeteer.errors as errors
 
-from .. import DOMElement
+from .. import DOMElement, ElementIndex
 from ..base import UIBaseLib
+from ..helpers import registry
+from ..locators import LocatorPath
+from ..wait import Wait, wait_for_attribute
+
+
+registry.register('tabbar.get_handle_for_tab', """
+  function (aTab) {
+    let win = aTab.linkedBrowser.contentWindowAsCPOW;
+    return win.QueryInterface(Ci.nsIInterfaceRequestor)
+              .getInterface(Ci.nsIDOMWindowUtils)
+              .outerWindowID.toString();
+  }
+""")
 
 
 class TabBar(UIBaseLib):
     """Wraps the tabs toolbar DOM element inside a browser window."""
 
+    _newtab_button_path = LocatorPath(('id', 'tabbrowser-tabs'),
+                                      ('anon attribute', {'anonid': 'tabs-newtab-button'}))
+
+    def __init__(self, *args, **kwargs):
+        UIBaseLib.__init__(self, *args, **kwargs)
+
+        self._menupanel = None
+
     # Properties for visual elements of the tabs toolbar #
 
     @property
@@ -26,7 +43,10 @@ class TabBar(UIBaseLib):
 
         :returns: :class:`~ui.menu.MenuPanel` instance
         """
-        return MenuPanel(lambda: self.marionette, self.window)
+        if not self._menupanel:
+            self._menupanel = MenuPanel(lambda: self.marionette, self.window)
+
+        return self._menupanel
 
     @property
     def newtab_button(self):
@@ -34,7 +54,7 @@ class TabBar(UIBaseLib):
 
         :returns: Reference to the new tab button
         """
-        return self.toolbar.find_element('anon attribute', {'anonid': 'tabs-newtab-button'})
+        return self._newtab_button_path.find_element(self.marionette)
 
     @property
     def tabs(self):
@@ -52,7 +72,7 @@ class TabBar(UIBaseLib):
 
         :returns: Reference to the tabs toolbar
         """
-        return self.marionette.find_element('id', 'tabbrowser-tabs')
+        return self.element_cache.find_element('id', 'tabbrowser-tabs')
 
     # Properties for helpers when working with the tabs toolbar #
 
@@ -82,6 +102,8 @@ class TabBar(UIBaseLib):
 
         :param exceptions: Optional, list of :class:`Tab` instances not to close
         """
+        exceptions = exceptions or []
+
         # Get handles from tab exceptions, and find those which can be closed
         for tab in self.tabs:
             if tab not in exceptions:
@@ -130,11 +152,9 @@ class TabBar(UIBaseLib):
         elif trigger == 'button':
             self.window.tabbar.newtab_button.click()
         elif trigger == 'menu':
-            # TODO: Make use of menubar class once it supports ids
-            menu = self.window.marionette.find_element('id', 'menu_newNavigatorTab')
-            menu.click()
+            self.window.menubar.select_by_id('menu_newNavigatorTab')
         elif trigger == 'shortcut':
-            self.window.send_shortcut(self.window.get_localized_entity('tabCmd.commandkey'),
+            self.window.send_shortcut(self.window._get_localized_entity('tabCmd.commandkey'),
                                       accel=True)
         # elif - need to add other cases
         else:
@@ -193,14 +213,7 @@ class TabBar(UIBaseLib):
         # implementation. To avoid this, the capacity to get the XUL
         # element corresponding to the active window according to
         # marionette or a similar ability should be added to marionette.
-        handle = marionette.execute_script("""
-          let win = arguments[0].linkedBrowser.contentWindowAsCPOW;
-          return win.QueryInterface(Ci.nsIInterfaceRequestor)
-                    .getInterface(Ci.nsIDOMWindowUtils)
-                    .outerWindowID.toString();
-        """, script_args=[tab_element])
-
-        return handle
+        return registry.call(marionette, 'tabbar.get_handle_for_tab', tab_element)
 
 
 class Tab(UIBaseLib):
@@ -213,11 +226,7 @@ class Tab(UIBaseLib):
         self._handle = TabBar.get_handle_for_tab(self.marionette, tab_element)
 
         # Ensure the tab has been fully loaded
-        Wait(self.marionette).until(
-            lambda mn: mn.execute_script("""
-              return !arguments[0].hasAttribute('busy');
-            """, script_args=[tab_element])
-        )
+        wait_for_attribute(tab_element, 'busy', predicate='value === null')
 
     # Properties for visual elements of tabs #
 
@@ -286,11 +295,9 @@ class Tab(UIBaseLib):
         elif trigger == 'button':
             self.close_button.click()
         elif trigger == 'menu':
-            # TODO: Make use of menubar class once it supports ids
-            menu = self.window.marionette.find_element('id', 'menu_close')
-            menu.click()
+            self.window.menubar.select_by_id('menu_close')
         elif trigger == 'shortcut':
-            self.window.send_shortcut(self.window.get_localized_entity('closeCmd.key'),
+            self.window.send_shortcut(self.window._get_localized_entity('closeCmd.key'),
                                       accel=True)
         else:
             raise ValueError('Unknown closing method: "%s"' % trigger)
@@ -307,7 +314,52 @@ class Tab(UIBaseLib):
         self.switch_to()
 
         # Bug 1121705: Maybe we have to wait for TabSelect event
-        Wait(self.marionette).until(lambda _: self.selected)
+        wait_for_attribute(self.tab_element, 'selected', predicate='value !== null')
+
+    def set_session_history(self, entries, index=None, timeout=None):
+        """Replaces the session history of the tab with the given entries.
+
+        Instead of loading each page, the history is injected via the tab state
+        of SessionStore. The method returns after the `SSTabRestored` event has
+        been fired for the tab, which is after the current entry has been loaded.
+
+        :param entries: List of session history entries. Each entry can either be
+         a URL string, or a dict with the keys `url` and optionally `title`.
+
+        :param index: Optional, index of the current entry in the list of
+         entries. Defaults to the last entry.
+
+        :param timeout: Optional, script timeout in milliseconds. Defaults to the
+         Marionette script timeout.
+        """
+        entries = [{'url': entry} if isinstance(entry, basestring) else entry
+                   for entry in entries]
+        if not entries:
+            raise ValueError('At least one session history entry has to be specified')
+
+        if index is None:
+            index = len(entries) - 1
+        elif not 0 <= index < len(entries):
+            raise IndexError('Session history index out of range: %s' % index)
+
+        with self.marionette.using_context('chrome'):
+            self.marionette.execute_async_script("""
+              Cu.import("resource:///modules/sessionstore/SessionStore.jsm");
+
+              let tab = arguments[0];
+              let state = {
+                entries: arguments[1],
+                // SessionStore uses a 1-based index
+                index: arguments[2] + 1
+              };
+
+              tab.addEventListener("SSTabRestored", function onRestored() {
+                tab.removeEventListener("SSTabRestored", onRestored);
+                marionetteScriptFinished(true);
+              });
+
+              SessionStore.setTabState(tab, JSON.stringify(state));
+            """, script_args=[self.tab_element, entries, index], script_timeout=timeout)
 
     def switch_to(self):
         """Switches the context of Marionette to this tab.
@@ -320,32 +372,38 @@ class Tab(UIBaseLib):
 
 class MenuPanel(UIBaseLib):
 
+    def __init__(self, *args, **kwargs):
+        UIBaseLib.__init__(self, *args, **kwargs)
+
+        self._popup = None
+
     @property
     def popup(self):
         """
         :returns: The :class:`MenuPanelElement`.
         """
-        popup = self.marionette.find_element('id', 'PanelUI-popup')
-        return self.MenuPanelElement(popup)
+        if not self._popup:
+            popup = self.marionette.find_element('id', 'PanelUI-popup')
+            self._popup = self.MenuPanelElement(popup)
+
+        return self._popup
 
     class MenuPanelElement(DOMElement):
         """
         Wraps the menu panel.
         """
-        _buttons = None
+        _button_index = None
+
+        _buttons_path = LocatorPath(('id', 'PanelUI-multiView'),
+                                    ('anon attribute', {'anonid': 'viewContainer'}),
+                                    ('tag name', 'toolbarbutton'))
 
         @property
         def buttons(self):
             """
             :returns: A list of all the clickable buttons in the menu panel.
             """
-            if not self._buttons:
-                self._buttons = (self.find_element('id', 'PanelUI-multiView')
-                                     .find_element('anon attribute',
-                                                   {'anonid': 'viewContainer'})
-                                     .find_elements('tag name',
-                                                    'toolbarbutton'))
-            return self._buttons
+            return self._buttons_path.find_elements(self.marionette, self)
 
         def click(self, target=None):
             """
@@ -357,8 +415,12 @@ class MenuPanel(UIBaseLib):
             if not target:
                 return DOMElement.click(self)
 
-            for button in self.buttons:
-                if button.get_attribute('label') == target:
-                    return button.click()
+            if self._button_index is None:
+                multiview = self.find_element('id', 'PanelUI-multiView')
+                self._button_index = ElementIndex(multiview, lambda: self.buttons, 'label')
+
+            button = self._button_index.get(target)
+            if button is not None:
+                return button.click()
             raise NoSuchElementException('Could not find "{}"" in the '
                                          'menu panel UI'.format(target))
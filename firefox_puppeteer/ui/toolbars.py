@@ -2,26 +2,34 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this file,
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
-from marionette import Wait, By
+from marionette import By
 
+from .. import DOMElement
 from ..api.keys import Keys
 from ..api.l10n import L10n
-from ..base import BaseLib
-from ..decorators import use_class_as_property
+from ..base import UIBaseLib
+from ..locators import LocatorPath
+from ..wait import wait_for_attribute
+from .menu import MenuPopup
 
 
-class NavBar(BaseLib):
+class NavBar(UIBaseLib):
     """ The NavBar class provides access to elements contained in the
     navigation bar as well as the locationbar.
     """
 
+    def __init__(self, *args, **kwargs):
+        UIBaseLib.__init__(self, *args, **kwargs)
+
+        self._locationbar = None
+
     @property
     def back_button(self):
         """ Provides access to the back button from the navbar ui.
 
         :returns: The back button element.
         """
-        return self.marionette.find_element('id', 'back-button')
+        return self.element_cache.find_element('id', 'back-button')
 
     @property
     def forward_button(self):
@@ -29,7 +37,7 @@ class NavBar(BaseLib):
 
         :returns: The forward button element.
         """
-        return self.marionette.find_element('id', 'forward-button')
+        return self.element_cache.find_element('id', 'forward-button')
 
     @property
     def home_button(self):
@@ -37,15 +45,19 @@ class NavBar(BaseLib):
 
         :returns: The home button element.
         """
-        return self.marionette.find_element('id', 'home-button')
+        return self.element_cache.find_element('id', 'home-button')
 
-    @use_class_as_property('ui.toolbars.LocationBar')
+    @property
     def locationbar(self):
         """Provides members for accessing and manipulationg the
         locationbar.
 
         See the :class:`~ui.toolbars.LocationBar` reference.
         """
+        if not self._locationbar:
+            self._locationbar = LocationBar(lambda: self.marionette, self.window)
+
+        return self._locationbar
 
     @property
     def menu_button(self):
@@ -53,10 +65,10 @@ class NavBar(BaseLib):
 
         :returns: The menu button element.
         """
-        return self.marionette.find_element('id', 'PanelUI-menu-button')
+        return self.element_cache.find_element('id', 'PanelUI-menu-button')
 
 
-class LocationBar(BaseLib):
+class LocationBar(UIBaseLib):
     """Various utilities for interacting with the location bar (the text area
     of the ui that typically displays the current url).
     """
@@ -64,43 +76,55 @@ class LocationBar(BaseLib):
     dtds = ["chrome://branding/locale/brand.dtd",
             "chrome://browser/locale/browser.dtd"]
 
+    _contextmenu_path = LocatorPath(('id', 'urlbar'),
+                                    ('anon attribute', {'anonid': 'textbox-input-box'}),
+                                    ('anon attribute', {'anonid': 'input-box-contextmenu'}))
+    _history_drop_marker_path = LocatorPath(('id', 'urlbar'),
+                                            ('anon attribute', {'anonid': 'historydropmarker'}))
+    _urlbar_input_path = LocatorPath(('id', 'urlbar'),
+                                     ('anon attribute', {'anonid': 'input'}))
+
     def __init__(self, *args, **kwargs):
-        BaseLib.__init__(self, *args, **kwargs)
+        UIBaseLib.__init__(self, *args, **kwargs)
         # TODO: A "utility" module that sets up the client directly would be
         # useful here.
         self.l10n = L10n(self.get_marionette)
         self.keys = Keys(self.get_marionette)
 
-    @use_class_as_property('ui.toolbars.AutocompleteResults')
+        self._autocomplete_results = None
+        self._identity_popup = None
+
+    @property
     def autocomplete_results(self):
         """Provides utility members for accessing and manipulationg the
         locationbar.
 
         See the :class:`~ui.toolbars.AutocompleteResults` reference.
         """
+        if not self._autocomplete_results:
+            self._autocomplete_results = AutocompleteResults(lambda: self.marionette, self.window)
+
+        return self._autocomplete_results
 
     def clear(self):
         """ Clears the contents of the url bar (via the DELETE shortcut).
         """
         self.focus('shortcut')
         self.urlbar.send_keys(Keys.DELETE)
-        Wait(self.marionette).until(
-            lambda _: self.urlbar.get_attribute('value') == '')
+        wait_for_attribute(self.urlbar, 'value', value='', as_property=True)
 
     def close_context_menu(self):
-        """ Closes the Location Bar context menu by a key event.
+        """ Closes the Location Bar context menu, and waits until it is hidden.
         """
-        # TODO: This method should be implemented via the menu API.
-        self.contextmenu.send_keys(Keys.ESCAPE)
+        self.contextmenu.close()
 
     @property
     def contextmenu(self):
         """ Provides access to the urlbar context menu.
 
-        :returns: The urlbar contextmenu element.
+        :returns: The urlbar contextmenu as :class:`~ui.menu.MenuPopup`.
         """
-        parent = self.urlbar.find_element('anon attribute', {'anonid': 'textbox-input-box'})
-        return parent.find_element('anon attribute', {'anonid': 'input-box-contextmenu'})
+        return MenuPopup(self._contextmenu_path.find_element(self.marionette))
 
     @property
     def favicon(self):
@@ -108,7 +132,7 @@ class LocationBar(BaseLib):
 
         :returns: The favicon element.
         """
-        return self.marionette.find_element(By.ID, 'page-proxy-favicon')
+        return self.element_cache.find_element(By.ID, 'page-proxy-favicon')
 
     def focus(self, evt='click'):
         """Focus the location bar according to the provided event.
@@ -119,15 +143,14 @@ class LocationBar(BaseLib):
         if evt == 'click':
             self.urlbar.click()
         elif evt == 'shortcut':
-            cmd_key = self.l10n.get_localized_entity(LocationBar.dtds,
-                                                     'openCmd.commandkey')
-            (self.marionette.find_element(By.ID, 'main-window')
-                            .send_keys(self.keys.ACCEL, cmd_key))
+            cmd_key = self.l10n._get_localized_entity(LocationBar.dtds,
+                                                      'openCmd.commandkey')
+            (self.element_cache.find_element(By.ID, 'main-window')
+                               .send_keys(self.keys.ACCEL, cmd_key))
         else:
             raise ValueError("An unknown event type was passed: %s" % evt)
 
-        Wait(self.marionette).until(
-            lambda _: self.urlbar.get_attribute('focused') == 'true')
+        wait_for_attribute(self.urlbar, 'focused', value='true')
 
     def get_contextmenu_entry(self, action):
         """ Retirieves the urlbar context menu entry corresponding
@@ -136,10 +159,10 @@ class LocationBar(BaseLib):
         :param action: The action correspoding to the retrieved value.
         :returns: The urlbar contextmenu entry.
         """
-        # TODO: This method should be implemented via the menu API.
         entries = self.contextmenu.find_elements('css selector', 'menuitem')
+        values = DOMElement.get_attributes(entries, ['cmd'])
         filter_on = 'cmd_%s' % action
-        found = [e for e in entries if e.get_attribute('cmd') == filter_on]
+        found = [e for e, v in zip(entries, values) if v['cmd'] == filter_on]
         return found[0] if len(found) else None
 
     @property
@@ -148,15 +171,19 @@ class LocationBar(BaseLib):
 
         :returns: The history drop marker.
         """
-        return self.urlbar.find_element('anon attribute', {'anonid': 'historydropmarker'})
+        return self._history_drop_marker_path.find_element(self.marionette)
 
-    @use_class_as_property('ui.toolbars.IdentityPopup')
+    @property
     def identity_popup(self):
         """Provides utility members for accessing and manipulationg the
         locationbar.
 
         See the :class:`~ui.toolbars.IdentityPopup` reference.
         """
+        if not self._identity_popup:
+            self._identity_popup = IdentityPopup(lambda: self.marionette, self.window)
+
+        return self._identity_popup
 
     def load_url(self, url):
         """Load the specified url in the location bar by synthesized
@@ -174,7 +201,12 @@ class LocationBar(BaseLib):
 
         :returns: The notification popup.
         """
-        return self.marionette.find_element(By.ID, "notification-popup")
+        return self.element_cache.find_element(By.ID, "notification-popup")
+
+    def open_context_menu(self):
+        """ Opens the Location Bar context menu, and waits until it is shown.
+        """
+        self.contextmenu.open(self.urlbar_input)
 
     @property
     def reload_button(self):
@@ -182,7 +214,7 @@ class LocationBar(BaseLib):
 
         :returns: The reload button.
         """
-        return self.marionette.find_element(By.ID, 'urlbar-reload-button')
+        return self.element_cache.find_element(By.ID, 'urlbar-reload-button')
 
     def reload_url(self, trigger='button', force=False):
         """Reload the currently open page.
@@ -197,8 +229,8 @@ class LocationBar(BaseLib):
         if trigger == 'button':
             self.reload_button.click()
         elif trigger == 'shortcut':
-            cmd_key = self.l10n.get_localized_entity(LocationBar.dtds,
-                                                     'reloadCmd.commandkey')
+            cmd_key = self.l10n._get_localized_entity(LocationBar.dtds,
+                                                      'reloadCmd.commandkey')
             self.urlbar.send_keys(cmd_key)
         elif trigger == 'shortcut2':
             self.urlbar.send_keys(self.keys.F5)
@@ -209,7 +241,7 @@ class LocationBar(BaseLib):
 
         :returns: The stop button.
         """
-        return self.marionette.find_element(By.ID, 'urlbar-stop-button')
+        return self.element_cache.find_element(By.ID, 'urlbar-stop-button')
 
     @property
     def urlbar(self):
@@ -217,7 +249,7 @@ class LocationBar(BaseLib):
 
         :returns: The urlbar element.
         """
-        return self.marionette.find_element(By.ID, 'urlbar')
+        return self.element_cache.find_element(By.ID, 'urlbar')
 
     @property
     def urlbar_input(self):
@@ -225,7 +257,7 @@ class LocationBar(BaseLib):
 
         :returns: The urlbar_input element
         """
-        return self.urlbar.find_element('anon attribute', {'anonid': 'input'})
+        return self._urlbar_input_path.find_element(self.marionette)
 
     @property
     def value(self):
@@ -236,12 +268,15 @@ class LocationBar(BaseLib):
         return self.urlbar.get_attribute('value')
 
 
-class AutocompleteResults(BaseLib):
+class AutocompleteResults(UIBaseLib):
     """Library for interacting with autocomplete results.
     """
 
+    _results_path = LocatorPath(('id', 'PopupAutoCompleteRichResult'),
+                                ('anon attribute', {'anonid': 'richlistbox'}))
+
     def __init__(self, *args, **kwargs):
-        BaseLib.__init__(self, *args, **kwargs)
+        UIBaseLib.__init__(self, *args, **kwargs)
         # TODO: A "utility" module that sets up the client directly would be
         # useful here.
         self.l10n = L10n(self.get_marionette)
@@ -261,10 +296,9 @@ class AutocompleteResults(BaseLib):
               arguments[0].hidePopup();
             """, script_args=[self.popup])
         else:
-            (self.marionette.find_element('id', 'urlbar')
-                            .send_keys(Keys.ESCAPE))
-        Wait(self.marionette).until(
-            lambda _: not self.is_open)
+            (self.element_cache.find_element('id', 'urlbar')
+                               .send_keys(Keys.ESCAPE))
+        wait_for_attribute(self.popup, 'state', predicate="value != 'open'", as_property=True)
 
     def get_matching_text(self, result, match_type):
         """Retuns an array of strings of the matching text within a autocomplete
@@ -328,8 +362,7 @@ class AutocompleteResults(BaseLib):
 
         :returns: The popup result element.
         """
-        return self.marionette.find_element(By.ID,
-                                            'PopupAutoCompleteRichResult')
+        return self.element_cache.find_element(By.ID, 'PopupAutoCompleteRichResult')
 
     @property
     def results(self):
@@ -337,33 +370,32 @@ class AutocompleteResults(BaseLib):
 
         :returns: The result container node.
         """
-        return self.popup.find_element('anon attribute',
-                                       {'anonid': 'richlistbox'})
+        return self._results_path.find_element(self.marionette)
 
 
-class IdentityPopup(BaseLib):
+class IdentityPopup(UIBaseLib):
     """Library wrapping selectors for interacting with the identity popup.
     """
 
     @property
     def box(self):
-        return self.marionette.find_element(By.ID, 'identity-box')
+        return self.element_cache.find_element(By.ID, 'identity-box')
 
     @property
     def country_label(self):
-        return self.marionette.find_element(By.ID, 'identity-icon-country-label')
+        return self.element_cache.find_element(By.ID, 'identity-icon-country-label')
 
     @property
     def encryption_label(self):
-        return self.marionette.find_element(By.ID, 'identity-popup-encryption-label')
+        return self.element_cache.find_element(By.ID, 'identity-popup-encryption-label')
 
     @property
     def encryption_icon(self):
-        return self.marionette.find_element(By.ID, 'identity-popup-encryption-icon')
+        return self.element_cache.find_element(By.ID, 'identity-popup-encryption-icon')
 
     @property
     def host(self):
-        return self.marionette.find_element(By.ID, 'identity-popup-content-host')
+        return self.element_cache.find_element(By.ID, 'identity-popup-content-host')
 
     @property
     def is_open(self):
@@ -375,28 +407,64 @@ class IdentityPopup(BaseLib):
 
     @property
     def more_info_button(self):
-        return self.marionette.find_element(By.ID, 'identity-popup-more-info-button')
+        return self.element_cache.find_element(By.ID, 'identity-popup-more-info-button')
 
     @property
     def organization_label(self):
-        return self.marionette.find_element(By.ID, 'identity-icon-label')
+        return self.element_cache.find_element(By.ID, 'identity-icon-label')
 
     @property
     def owner(self):
-        return self.marionette.find_element(By.ID, 'identity-popup-content-owner')
+        return self.element_cache.find_element(By.ID, 'identity-popup-content-owner')
 
     @property
     def owner_location(self):
-        return self.marionette.find_element(By.ID, 'identity-popup-content-supplemental')
+        return self.element_cache.find_element(By.ID, 'identity-popup-content-supplemental')
 
     @property
     def popup(self):
-        return self.marionette.find_element(By.ID, 'identity-popup')
+        return self.element_cache.find_element(By.ID, 'identity-popup')
 
     @property
     def permissions(self):
-        return self.marionette.find_element(By.ID, 'identity-popup-permissions')
+        return self.element_cache.find_element(By.ID, 'identity-popup-permissions')
+
+    def state(self):
+        """ Retrieves the complete state of the identity box and popup at once.
+
+        :returns: A dict with the keys `box_class`, `country_label`,
+         `encryption_label`, `host`, `is_open`, `organization_label`, `owner`,
+         `owner_location`, and `verifier`. For labels the value, and for all
+         other elements the text content is returned.
+        """
+        return self.marionette.execute_script("""
+          let ids = {
+            country_label: "identity-icon-country-label",
+            encryption_label: "identity-popup-encryption-label",
+            host: "identity-popup-content-host",
+            organization_label: "identity-icon-label",
+            owner: "identity-popup-content-owner",
+            owner_location: "identity-popup-content-supplemental",
+            verifier: "identity-popup-content-verifier"
+          };
+
+          let state = {
+            box_class: document.getElementById("identity-box").className,
+            is_open: document.getElementById("identity-popup").state == "open"
+          };
+
+          for (let name in ids) {
+            let element = document.getElementById(ids[name]);
+            if (element.hasAttribute("value")) {
+              state[name] = element.getAttribute("value");
+            } else {
+              state[name] = element.textContent;
+            }
+          }
+
+          return state;
+        """)
 
     @property
     def verifier(self):
-        return self.marionette.find_element(By.ID, 'identity-popup-content-verifier')
+        return self.element_cache.find_element(By.ID, 'identity-popup-content-verifier')
@@ -2,9 +2,10 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this file,
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import json
 from time import sleep
 
-from marionette import By, Wait
+from marionette import By
 from marionette.errors import NoSuchWindowException
 from marionette.keys import Keys
 
@@ -12,7 +13,19 @@ import firefox_puppeteer.errors as errors
 
 from ..api.l10n import L10n
 from ..base import BaseLib
-from ..decorators import use_class_as_property
+from ..helpers import registry
+from ..wait import Wait
+from .snapshot import SnapshotNode
+
+
+registry.register('windows.get_focused_handle', """
+  function () {
+    let win = Services.wm.getMostRecentWindow("");
+    return win.QueryInterface(Ci.nsIInterfaceRequestor)
+              .getInterface(Ci.nsIDOMWindowUtils)
+              .outerWindowID.toString();
+  }
+""")
 
 
 class Windows(BaseLib):
@@ -41,14 +54,7 @@ class Windows(BaseLib):
 
         :returns: The `window handle` of the focused chrome window.
         """
-        with self.marionette.using_context('chrome'):
-            return self.marionette.execute_script("""
-              Cu.import("resource://gre/modules/Services.jsm");
-              var win = Services.wm.getMostRecentWindow("");
-              return win.QueryInterface(Ci.nsIInterfaceRequestor)
-                        .getInterface(Ci.nsIDOMWindowUtils)
-                        .outerWindowID.toString();
-            """)
+        return registry.call(self.marionette, 'windows.get_focused_handle')
 
     def close(self, handle):
         """Closes the chrome window with the given handle.
@@ -126,6 +132,109 @@ class Windows(BaseLib):
         wait = Wait(self.marionette)
         wait.until(lambda m: handle == self.focused_chrome_window_handle)
 
+    def get_browser_state(self):
+        """Retrieves the state of all browser windows and their tabs.
+
+        :returns: The state as returned by `SessionStore.getBrowserState()`.
+        """
+        with self.marionette.using_context('chrome'):
+            state = self.marionette.execute_script("""
+              Cu.import("resource:///modules/sessionstore/SessionStore.jsm");
+
+              return SessionStore.getBrowserState();
+            """)
+
+        return json.loads(state)
+
+    def restore_browser_state(self, state=None, filename=None, timeout=None):
+        """Restores the given state of browser windows and tabs in one step.
+
+        All existing browser windows are replaced via `SessionStore.setBrowserState()`.
+        The method returns after all windows have been restored, and none of their
+        tabs is busy anymore. Tabs which are restored on demand are not loaded.
+
+        Afterward the context is switched to the first restored browser window.
+
+        :param state: Optional, the state as returned by :func:`get_browser_state`.
+
+        :param filename: Optional, name of a JSON fixture file as written by
+         :func:`save_browser_state`. Only used if no `state` has been specified.
+
+        :param timeout: Optional, script timeout in milliseconds. Defaults to the
+         Marionette script timeout.
+
+        :returns: List of :class:`BrowserWindow` instances of the restored windows.
+        """
+        if state is None:
+            if filename is None:
+                raise ValueError('Either "state" or "filename" has to be specified')
+            with open(filename) as f:
+                state = json.load(f)
+
+        with self.marionette.using_context('chrome'):
+            handles = self.marionette.execute_async_script("""
+              Cu.import("resource:///modules/sessionstore/SessionStore.jsm");
+
+              let topic = "sessionstore-browser-state-restored";
+
+              function getHandle(aWindow) {
+                return aWindow.QueryInterface(Ci.nsIInterfaceRequestor)
+                              .getInterface(Ci.nsIDOMWindowUtils)
+                              .outerWindowID.toString();
+              }
+
+              function waitForTabs() {
+                let handles = [];
+                let busy = false;
+
+                let windows = Services.wm.getEnumerator("navigator:browser");
+                while (windows.hasMoreElements()) {
+                  let win = windows.getNext();
+                  for (let tab of win.gBrowser.tabs) {
+                    busy = busy || tab.hasAttribute("busy");
+                  }
+                  handles.push(getHandle(win));
+                }
+
+                if (busy) {
+                  setTimeout(waitForTabs, 50);
+                } else {
+                  marionetteScriptFinished(handles);
+                }
+              }
+
+              let observer = {
+                observe: function (aSubject, aTopic, aData) {
+                  Services.obs.removeObserver(observer, topic);
+                  waitForTabs();
+                }
+              };
+
+              Services.obs.addObserver(observer, topic, false);
+              SessionStore.setBrowserState(JSON.stringify(arguments[0]));
+            """, script_args=[state], script_timeout=timeout)
+
+        windows = [BrowserWindow(lambda: self.marionette, handle) for handle in handles]
+        if windows:
+            windows[0].switch_to()
+
+        return windows
+
+    def save_browser_state(self, filename):
+        """Saves the state of all browser windows and their tabs to a JSON file.
+
+        The file can be used as fixture for :func:`restore_browser_state`.
+
+        :param filename: Name of the file to write the state to.
+
+        :returns: The saved state.
+        """
+        state = self.get_browser_state()
+        with open(filename, 'w') as f:
+            json.dump(state, f, indent=2)
+
+        return state
+
     def switch_to(self, target):
         """Switches context to the specified chrome window.
 
@@ -182,6 +291,8 @@ class BaseWindow(BaseLib):
                                             window_handle)
         self._handle = window_handle
 
+        self._menubar = None
+
     def __eq__(self, other):
         return self.handle == other.handle
 
@@ -208,12 +319,17 @@ class BaseWindow(BaseLib):
         """
         return self._handle
 
-    @use_class_as_property('ui.menu.MenuBar')
+    @property
     def menubar(self):
         """Provides access to the menu bar. For example the 'File' menu.
 
         See the :class:`~ui.menu.MenuBar` reference.
         """
+        if not self._menubar:
+            from .menu import MenuBar
+            self._menubar = MenuBar(lambda: self.marionette, self)
+
+        return self._menubar
 
     @property
     def window(self):
@@ -223,7 +339,7 @@ class BaseWindow(BaseLib):
         """
         self.switch_to()
 
-        return self.marionette.find_element(By.CSS_SELECTOR, ':root')
+        return self.element_cache.find_element(By.CSS_SELECTOR, ':root')
 
     def close(self, callback=None, force=False):
         """Closes the current chrome window.
@@ -285,6 +401,10 @@ class BaseWindow(BaseLib):
         """
         return self._l10n.get_localized_entity(self.dtds, property_id)
 
+    def _get_localized_entity(self, entity_id):
+        # Shortcuts need the value right away, even inside of a batch
+        return self._l10n._get_localized_entity(self.dtds, entity_id)
+
     def open_window(self, callback=None, expected_window_class=None):
         """Opens a new top-level chrome window
 
@@ -366,6 +486,77 @@ class BaseWindow(BaseLib):
         self.switch_to()
         self.window.send_keys(*keys)
 
+    def snapshot(self, attributes=None, anonymous=True):
+        """Takes a snapshot of the DOM tree of the chrome window.
+
+        The whole tree is serialized with a single command. Queries and
+        assertions against the returned :class:`~ui.snapshot.SnapshotNode` do
+        not need any further command.
+
+        :param attributes: Optional, list of attribute names to capture. The
+         `id` and `class` attributes are always captured. Defaults to all
+         attributes.
+
+        :param anonymous: Optional, if `True` anonymous content is included.
+         Defaults to `True`.
+
+        :returns: The :class:`~ui.snapshot.SnapshotNode` of the root element.
+        """
+        self.switch_to()
+
+        if attributes is not None:
+            attributes = list(set(attributes) | set(['class', 'id']))
+
+        with self.marionette.using_context('chrome'):
+            data = self.marionette.execute_script("""
+              let [names, includeAnonymous] = arguments;
+
+              function serialize(aNode, aAnonymous) {
+                let data = {tag: aNode.localName, attributes: {}};
+
+                for (let attribute of aNode.attributes) {
+                  if (!names || names.indexOf(attribute.name) != -1) {
+                    data.attributes[attribute.name] = attribute.value;
+                  }
+                }
+
+                if (aAnonymous) {
+                  data.anonymous = true;
+                }
+
+                let text = "";
+                let children = [];
+                for (let child of aNode.childNodes) {
+                  if (child.nodeType == child.ELEMENT_NODE) {
+                    children.push(serialize(child, aAnonymous));
+                  } else if (child.nodeType == child.TEXT_NODE) {
+                    text += child.nodeValue;
+                  }
+                }
+
+                let anonNodes = includeAnonymous && document.getAnonymousNodes(aNode);
+                for (let child of (anonNodes || [])) {
+                  if (child.nodeType == child.ELEMENT_NODE) {
+                    children.push(serialize(child, true));
+                  }
+                }
+
+                text = text.trim();
+                if (text) {
+                  data.text = text;
+                }
+                if (children.length) {
+                  data.children = children;
+                }
+
+                return data;
+              }
+
+              return serialize(document.documentElement, false);
+            """, script_args=[attributes, anonymous])
+
+        return SnapshotNode(data)
+
     def switch_to(self, focus=False):
         """Switches the context to this chrome window.
 
@@ -405,6 +596,7 @@ class BrowserWindow(BaseWindow):
     def __init__(self, *args, **kwargs):
         BaseWindow.__init__(self, *args, **kwargs)
 
+        self._navbar = None
         self._tabbar = None
 
     @property
@@ -420,7 +612,7 @@ class BrowserWindow(BaseWindow):
                 return PrivateBrowsingUtils.isWindowPrivate(chromeWindow);
             """, script_args=[self.window])
 
-    @use_class_as_property('ui.toolbars.NavBar')
+    @property
     def navbar(self):
         """
         Provides access to the navigation bar. This is the toolbar containing
@@ -428,6 +620,11 @@ class BrowserWindow(BaseWindow):
 
         See the :class:`~ui.navbar.NavBar` reference.
         """
+        if not self._navbar:
+            from .toolbars import NavBar
+            self._navbar = NavBar(lambda: self.marionette, self)
+
+        return self._navbar
 
     @property
     def tabbar(self):
@@ -460,11 +657,9 @@ class BrowserWindow(BaseWindow):
             if callable(trigger):
                 trigger(win)
             elif trigger == 'menu':
-                # TODO: Make use of menubar class once it supports ids
-                menu = win.marionette.find_element('id', 'menu_closeWindow')
-                menu.click()
+                win.menubar.select_by_id('menu_closeWindow')
             elif trigger == 'shortcut':
-                win.send_shortcut(win.get_localized_entity('closeCmd.key'),
+                win.send_shortcut(win._get_localized_entity('closeCmd.key'),
                                   accel=True, shift=True)
             else:
                 raise ValueError('Unknown closing method: "%s"' % trigger)
@@ -487,13 +682,11 @@ class BrowserWindow(BaseWindow):
             if callable(trigger):
                 trigger(win)
             elif trigger == 'menu':
-                # TODO: Make use of menubar class once it supports ids
                 menu_id = 'menu_newPrivateWindow' if is_private else 'menu_newNavigator'
-                menu = win.marionette.find_element('id', menu_id)
-                menu.click()
+                win.menubar.select_by_id(menu_id)
             elif trigger == 'shortcut':
                 cmd_key = 'privateBrowsingCmd.commandkey' if is_private else 'newNavigatorCmd.key'
-                win.send_shortcut(win.get_localized_entity(cmd_key),
+                win.send_shortcut(win._get_localized_entity(cmd_key),
                                   accel=True, shift=is_private)
             else:
                 raise ValueError('Unknown opening method: "%s"' % trigger)
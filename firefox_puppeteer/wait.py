@@ -0,0 +1,283 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+import sys
+import time
+
+from marionette import Wait as MarionetteWait
+from marionette.errors import TimeoutException
+from marionette.wait import DEFAULT_INTERVAL, until_pred
+
+from . import root
+
+
+class Wait(MarionetteWait):
+    """Waits for a condition with adaptive polling, and records statistics.
+
+    Most conditions of puppeteer are met within a few milliseconds, but a
+    fixed polling interval delays each of them by the full interval. Unless
+    an `interval` is specified, the condition gets polled in short intervals
+    first, which grow by `backoff` up to `max_interval`.
+
+    For each call site of :func:`until` the number of polls and the time to
+    the condition are recorded in :attr:`stats`. See :func:`report` for a
+    summary.
+
+    :param marionette: The Marionette instance to pass to the condition.
+    :param timeout: Optional, the timeout in seconds. Defaults to the
+     timeout of the Marionette instance.
+    :param interval: Optional, a fixed polling interval in seconds. Defaults
+     to adaptive polling.
+    :param ignored_exceptions: Optional, exceptions to ignore while polling.
+    :param clock: Optional, an alternative clock implementation.
+    :param min_interval: Optional, the initial polling interval in seconds
+     for adaptive polling.
+    :param max_interval: Optional, the maximum polling interval in seconds
+     for adaptive polling.
+    :param backoff: Optional, the factor to grow the polling interval by.
+    """
+
+    # Statistics of all waits by call site
+    stats = {}
+
+    def __init__(self, marionette, timeout=None, interval=None, ignored_exceptions=None,
+                 clock=None, min_interval=0.01, max_interval=0.2, backoff=1.5):
+        MarionetteWait.__init__(self, marionette, timeout=timeout,
+                                interval=interval or DEFAULT_INTERVAL,
+                                ignored_exceptions=ignored_exceptions, clock=clock)
+
+        self.adaptive = interval is None
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+    def until(self, condition, is_true=None, message=''):
+        """Repeatedly runs the condition until its return value evaluates to true.
+
+        See :func:`marionette.Wait.until` for details.
+
+        :param condition: The callable to run with the Marionette instance.
+        :param is_true: Optional, a predicate which terminates the wait when
+         it returns `True`. It gets the clock and the end time.
+        :param message: Optional, a message to include in the exception if
+         the wait times out.
+
+        :returns: The return value of the condition.
+
+        :raises TimeoutException: When the condition is not met in time.
+        """
+        call_site = self._get_call_site(sys._getframe(1))
+
+        rv = None
+        last_exc = None
+        until = is_true or until_pred
+        interval = self.min_interval if self.adaptive else self.interval
+        polls = 0
+        start = self.clock.now
+
+        while not until(self.clock, self.end):
+            polls += 1
+            try:
+                rv = condition(self.marionette)
+            except (KeyboardInterrupt, SystemExit):
+                raise
+            except self.exceptions:
+                last_exc = sys.exc_info()
+
+            if rv:
+                self._record(call_site, polls, self.clock.now - start)
+                return rv
+
+            # Do not sleep beyond the end of the wait
+            self.clock.sleep(max(0, min(interval, self.end - self.clock.now)))
+            if self.adaptive:
+                interval = min(interval * self.backoff, self.max_interval)
+
+        duration = self.clock.now - start
+        self._record(call_site, polls, duration, timed_out=True)
+
+        if message:
+            message = ' with message: %s' % message
+
+        raise TimeoutException('Timed out after %s seconds%s' % (round(duration, 1), message),
+                               cause=last_exc)
+
+    @classmethod
+    def report(cls):
+        """Returns the statistics of all call sites, sorted by the total time.
+
+        :returns: List of dictionaries with the call site, the number of
+         calls, polls and timeouts, the total time, and the histogram of the
+         time to condition.
+        """
+        report = [dict(stats.to_dict(), call_site=call_site)
+                  for call_site, stats in cls.stats.items()]
+        return sorted(report, key=lambda entry: entry['duration'], reverse=True)
+
+    @staticmethod
+    def _get_call_site(frame):
+        filename = frame.f_code.co_filename
+        if filename.startswith(root + os.sep):
+            filename = os.path.relpath(filename, root)
+        else:
+            filename = os.path.basename(filename)
+
+        return '%s:%s (%s)' % (filename, frame.f_lineno, frame.f_code.co_name)
+
+    @classmethod
+    def _record(cls, call_site, polls, duration, timed_out=False):
+        if call_site not in cls.stats:
+            cls.stats[call_site] = WaitStats()
+        cls.stats[call_site].add(polls, duration, timed_out)
+
+
+class WaitStats(object):
+    """Statistics of all waits of a single call site."""
+
+    # Upper bounds of the histogram buckets in seconds
+    buckets = (0.01, 0.05, 0.1, 0.5, 1, 5)
+
+    def __init__(self):
+        self.calls = 0
+        self.duration = 0.0
+        self.histogram = [0] * (len(self.buckets) + 1)
+        self.polls = 0
+        self.timeouts = 0
+
+    def add(self, polls, duration, timed_out=False):
+        """Adds the result of a single wait.
+
+        :param polls: The number of times the condition has been polled.
+        :param duration: The time to the condition or the timeout in seconds.
+        :param timed_out: Optional, flag if the wait has timed out.
+        """
+        self.calls += 1
+        self.duration += duration
+        self.polls += polls
+        if timed_out:
+            self.timeouts += 1
+
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if duration < bound:
+                index = i
+                break
+        self.histogram[index] += 1
+
+    def to_dict(self):
+        """Returns the serializable statistics.
+
+        The histogram maps labels like `<0.05s` to the number of waits.
+        """
+        labels = ['<%ss' % bound for bound in self.buckets] + ['>=%ss' % self.buckets[-1]]
+
+        return {
+            'calls': self.calls,
+            'duration': self.duration,
+            'histogram': dict(zip(labels, self.histogram)),
+            'polls': self.polls,
+            'timeouts': self.timeouts,
+        }
+
+
+def wait_for_attribute(element, name, value=None, predicate=None, as_property=False,
+                       timeout=None):
+    """Waits until an attribute of a chrome element meets the condition.
+
+    Instead of polling the attribute over the wire, a single asynchronous
+    script observes the element via a `MutationObserver`, and returns as
+    soon as the condition holds.
+
+    Properties which are not reflected as attributes, like the `state` of a
+    popup, can be observed with `as_property=True`. They are additionally
+    checked every 10ms inside of the browser.
+
+    Example::
+
+        # Wait until the tab has been loaded
+        wait_for_attribute(tab_element, 'busy', predicate='value === null')
+
+    :param element: The chrome element to observe.
+    :param name: The name of the attribute, or the property.
+    :param value: The expected value as string. Mutually exclusive with
+     `predicate`.
+    :param predicate: A JavaScript expression, which gets the current value
+     as `value`. The current value is `null` if the attribute is not present.
+    :param as_property: Optional, if `True` observe the property of the element
+     instead of the attribute. Defaults to `False`.
+    :param timeout: Optional, the timeout in seconds. Defaults to the timeout
+     of the Marionette instance.
+
+    :returns: The value of the attribute when the condition holds.
+
+    :raises TimeoutException: When the condition is not met in time.
+    """
+    if (value is None) == (predicate is None):
+        raise ValueError('Either "value" or "predicate" has to be specified')
+
+    marionette = element.marionette
+    timeout = timeout or (marionette.timeout and marionette.timeout / 1000.0) or 5
+    call_site = Wait._get_call_site(sys._getframe(1))
+
+    start = time.time()
+    result = marionette.execute_async_script("""
+      let [element, name, expected, predicate, useProperty, timeout] = arguments;
+      let win = element.ownerDocument.defaultView;
+
+      let getValue = () => {
+        if (useProperty) {
+          let value = element[name];
+          return (value === undefined || value === null) ? null : String(value);
+        }
+        return element.hasAttribute(name) ? element.getAttribute(name) : null;
+      };
+      let check = predicate ? new Function("value", "return (" + predicate + ");")
+                            : (aValue => aValue === expected);
+
+      let observer, interval, timer;
+      let done = false;
+      let finish = aResult => {
+        if (done) {
+          return;
+        }
+        done = true;
+
+        observer.disconnect();
+        win.clearInterval(interval);
+        win.clearTimeout(timer);
+        marionetteScriptFinished(aResult);
+      };
+      let update = () => {
+        let value = getValue();
+        if (check(value)) {
+          finish({value: value});
+        }
+      };
+
+      observer = new win.MutationObserver(update);
+      if (useProperty) {
+        observer.observe(element, {attributes: true, childList: true, subtree: true});
+        interval = win.setInterval(update, 10);
+      }
+      else {
+        observer.observe(element, {attributes: true, attributeFilter: [name]});
+      }
+      timer = win.setTimeout(() => finish({timedOut: true, value: getValue()}), timeout);
+
+      update();
+    """, script_args=[element, name, value, predicate, as_property,
+                     int(timeout * 1000)],
+        script_timeout=int(timeout * 1000) + 5000)
+
+    duration = time.time() - start
+    Wait._record(call_site, 1, duration, timed_out=result.get('timedOut', False))
+
+    if result.get('timedOut'):
+        raise TimeoutException('Timed out after %s seconds waiting for %s "%s" to match %s '
+                               '(last value: %s)' %
+                               (round(duration, 1), 'property' if as_property else 'attribute',
+                                name, predicate or repr(value), result.get('value')))
+
+    return result.get('value')
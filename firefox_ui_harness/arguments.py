@@ -2,6 +2,8 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import os
+
 from marionette import BaseMarionetteOptions
 
 import firefox_ui_tests
@@ -10,6 +12,47 @@ import firefox_puppeteer
 
 class ReleaseTestParser(BaseMarionetteOptions):
 
+    def __init__(self, **kwargs):
+        BaseMarionetteOptions.__init__(self, **kwargs)
+
+        self.add_option('--command-report',
+                        dest='command_report',
+                        action='store_true',
+                        default=False,
+                        help='Record all Marionette commands per test, and write a '
+                             'report as command_report.json next to the log files.')
+        self.add_option('--trace-file',
+                        dest='trace_file',
+                        metavar='PATH',
+                        help='Write a timeline of the test run in the Chrome trace event '
+                             'format to the given file.')
+        self.add_option('--durations-file',
+                        dest='durations_file',
+                        metavar='PATH',
+                        help='History file of test durations, which is used to balance '
+                             'workers and chunks. Chunked runs need the same history file '
+                             'for all chunks.')
+        self.add_option('--workers',
+                        dest='workers',
+                        type='int',
+                        default=1,
+                        metavar='N',
+                        help='Run the tests in N Firefox instances in parallel, each with '
+                             'its own profile and Marionette port.')
+        self.add_option('--profile-cache',
+                        dest='profile_cache',
+                        metavar='PATH',
+                        help='Folder to cache warmed up profile templates in, one per build '
+                             'ID and set of preferences. Firefox instances start with a copy '
+                             'of the template, unless --profile is given.')
+        self.add_option('--warm-session',
+                        dest='warm_session',
+                        action='store_true',
+                        default=False,
+                        help='Keep the Firefox process and Marionette session for the whole '
+                             'run. Firefox only gets restarted with a clean profile after a '
+                             'test left a dirty browser, or after a crash.')
+
     def parse_args(self, *args, **kwargs):
         options, test_files = BaseMarionetteOptions.parse_args(self,
                                                                *args, **kwargs)
@@ -18,6 +61,20 @@ class ReleaseTestParser(BaseMarionetteOptions):
                     for (k, v) in vars(options).items()]):
             options.log_mach = '-'
 
+        if options.command_report:
+            options.command_report = os.path.join(self.get_log_dir(options),
+                                                  'command_report.json')
+
         if not test_files:
             test_files = [firefox_puppeteer.manifest, firefox_ui_tests.manifest]
         return (options, test_files)
+
+    def get_log_dir(self, options):
+        """Returns the folder of the first log file, or the current folder."""
+        for (k, v) in sorted(vars(options).items()):
+            if k.startswith('log_') and isinstance(v, list):
+                for path in v:
+                    if path != '-':
+                        return os.path.dirname(os.path.abspath(path))
+
+        return os.getcwd()
@@ -2,23 +2,145 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this file,
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
-from marionette import SkipTest
+import functools
 import os
 
-from firefox_puppeteer.api import appinfo
+from marionette import SkipTest
+
+from firefox_puppeteer.api.appinfo import AppInfo
+
+
+class SessionFacts(object):
+    """Facts about the browser, which do not change while its process is running.
+
+    The facts from the browser come from the :class:`AppInfo` snapshot, which
+    is retrieved with a single command on first access, and is shared by all
+    tests until Firefox gets restarted, even if they use separate sessions.
+    Facts which do not need the browser, like :attr:`xvfb`, never start a
+    session.
+
+    :param marionette: The Marionette instance to retrieve the facts from.
+    """
+
+    # The facts of the last browser process
+    _cached = None
+
+    def __init__(self, marionette):
+        self.marionette = marionette
+        self.process_key = self.get_process_key(marionette)
+
+        self.appinfo = AppInfo(lambda: self.marionette)
+        self._values = {}
+
+    @classmethod
+    def get(cls, marionette):
+        """Returns the facts for the current browser process.
+
+        :param marionette: The Marionette instance to retrieve the facts from.
+        """
+        if not cls._cached or cls._cached.process_key != cls.get_process_key(marionette):
+            cls._cached = cls(marionette)
+        cls._cached.marionette = marionette
+
+        return cls._cached
+
+    @staticmethod
+    def get_process_key(marionette):
+        """Returns the process id of the browser, or its address if not started by the runner.
+
+        :param marionette: The Marionette instance of the browser.
+        """
+        instance = marionette.instance
+        process = instance and instance.runner and instance.runner.process_handler
+        if process:
+            return process.pid
+
+        return (marionette.host, marionette.port)
+
+    @property
+    def build_id(self):
+        """The build ID of the application."""
+        return self._get_appinfo('appBuildID')
+
+    @property
+    def e10s(self):
+        """Flag if the browser runs with multiple processes."""
+        return self._get_appinfo('browserTabsRemoteAutostart')
+
+    @property
+    def platform(self):
+        """The name of the operating system, e.g. `Linux` or `WINNT`."""
+        return self._get_appinfo('OS')
+
+    @property
+    def xvfb(self):
+        """Flag if the browser runs under Xvfb."""
+        return bool(os.environ.get('MOZ_XVFB'))
+
+    def _get_appinfo(self, name):
+        if name not in self._values:
+            # A session gets started if none is active. The tests will use it.
+            if self.marionette.session is None:
+                self.marionette.start_session()
+
+                # Tests run in chrome context anyway, which saves a context switch
+                self.marionette.set_context('chrome')
+
+            self._values[name] = getattr(self.appinfo, name)
+
+        return self._values[name]
+
+
+def apply_skip_conditions(tests, marionette):
+    """Skips tests, whose conditions hold for the current browser, before they run.
+
+    Skipped tests get reported without running `setUp` and `tearDown`. Facts
+    from the browser are only retrieved if a condition needs them.
+
+    :param tests: The test case instances to check.
+    :param marionette: The Marionette instance to retrieve the facts from.
+    """
+    for test in tests:
+        conditions = getattr(getattr(test, test._testMethodName), 'skip_conditions', [])
+        for condition, reason in conditions:
+            if condition(SessionFacts.get(marionette)):
+                mark_skipped(test, reason)
+                break
+
+
+def mark_skipped(test, reason):
+    """Marks the test method of a single test case instance as skipped."""
+    def skipped(*args, **kwargs):
+        raise SkipTest(reason)
+
+    skipped.__unittest_skip__ = True
+    skipped.__unittest_skip_why__ = reason
+    setattr(test, test._testMethodName, skipped)
+
+
+def skip_if(condition, reason):
+    """Skips the decorated test if the condition holds for the session facts.
+
+    The condition is evaluated when the tests get collected. When the test
+    has not been collected by :class:`~testcase.FirefoxTestCase`, it is
+    evaluated right before the test method runs.
+
+    :param condition: Callable which gets the :class:`SessionFacts`.
+    :param reason: The reason to report for the skipped test.
+    """
+    def decorator(target):
+        @functools.wraps(target)
+        def wrapper(self, *args, **kwargs):
+            if condition(SessionFacts.get(self.marionette)):
+                raise SkipTest(reason)
+            return target(self, *args, **kwargs)
+
+        wrapper.skip_conditions = getattr(target, 'skip_conditions', []) + [(condition, reason)]
+        return wrapper
 
+    return decorator
 
-def skip_if_e10s(target):
-    def wrapper(self, *args, **kwargs):
-        if self.appinfo.browserTabsRemoteAutostart:
-            raise SkipTest("Skipping due to e10s")
-        return target(self, *args, **kwargs)
-    return wrapper
 
+skip_if_e10s = skip_if(lambda facts: facts.e10s, 'Skipping due to e10s')
 
-def skip_under_xvfb(target):
-    def wrapper(self, *args, **kwargs):
-        if os.environ.get('MOZ_XVFB'):
-            raise SkipTest("Skipping due to running under xvfb")
-        return target(self, *args, **kwargs)
-    return wrapper
+skip_under_xvfb = skip_if(lambda facts: facts.xvfb, 'Skipping due to running under xvfb')
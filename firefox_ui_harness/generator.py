@@ -0,0 +1,191 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import random
+import struct
+import threading
+import urllib
+import zlib
+from collections import OrderedDict
+
+
+# Path on the webserver under which generated content gets served
+PREFIX = '/generated/'
+
+# Default values and upper limits of the page parameters
+PAGE_PARAMS = OrderedDict([
+    ('nodes', (1000, 200000)),
+    ('weight', (0, 50000)),
+    ('images', (0, 1000)),
+    ('title', (20, 10000)),
+    ('frames', (0, 50)),
+    ('seed', (0, 2 ** 31)),
+])
+
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+         'incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud '
+         'exercitation ullamco laboris nisi aliquip ex ea commodo consequat').split()
+
+
+class PageGenerator(object):
+    """Generates HTML pages of a given size for benchmarks.
+
+    Pages are served as `/generated/page.html`, and are controlled by the
+    query parameters:
+
+    * `nodes`: The number of text elements in the body, not counting images,
+      frames, and the weight. Defaults to 1000.
+    * `weight`: Additional text content in KB. Defaults to 0.
+    * `images`: The number of images. Defaults to 0.
+    * `title`: The length of the title. Defaults to 20.
+    * `frames`: The number of subframes. Defaults to 0.
+    * `seed`: The seed for the generated text. Defaults to 0.
+
+    The same parameters always result in the same page. Generated content
+    is cached, so repeated requests only cost the transfer.
+
+    :param cache_size: Optional, the number of generated resources to cache.
+    """
+
+    def __init__(self, cache_size=100):
+        self.cache_size = cache_size
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, query=''):
+        """Returns the content type and content for a path, or `None`.
+
+        :param path: The path of the request below :data:`PREFIX`.
+        :param query: Optional, the query string of the request.
+        """
+        if path == 'page.html':
+            try:
+                params = parse_params(query)
+            except ValueError:
+                return None
+            key = ('page',) + tuple(params.values())
+            generate = lambda: ('text/html; charset=utf-8', generate_page(**params))
+
+        elif path.startswith('image/') and path.endswith('.png'):
+            try:
+                index = int(path[len('image/'):-len('.png')])
+            except ValueError:
+                return None
+            key = ('image', index)
+            generate = lambda: ('image/png', generate_image(index))
+
+        else:
+            return None
+
+        with self._lock:
+            if key in self._cache:
+                self._cache[key] = self._cache.pop(key)
+                return self._cache[key]
+
+        resource = generate()
+
+        with self._lock:
+            self._cache[key] = resource
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return resource
+
+
+def generate_image(index):
+    """Returns a 16x16 PNG image with a color depending on the index."""
+    width = height = 16
+    color = struct.pack('>I', (index * 2654435761) & 0xffffff)[1:]
+    raw = ''.join('\x00' + color * width for _ in range(height))
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    return ''.join([
+        '\x89PNG\r\n\x1a\n',
+        chunk('IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        chunk('IDAT', zlib.compress(raw)),
+        chunk('IEND', ''),
+    ])
+
+
+def generate_page(nodes, weight, images, title, frames, seed):
+    """Returns the HTML of a generated page. See :class:`PageGenerator`."""
+    rand = random.Random(seed)
+
+    def text(length):
+        words = []
+        size = 0
+        while size <= length:
+            words.append(rand.choice(WORDS))
+            size += len(words[-1]) + 1
+        return ' '.join(words)[:length]
+
+    html = ['<!DOCTYPE html>',
+            '<html><head><meta charset="utf-8">',
+            '<title>%s</title>' % text(title),
+            '</head><body>']
+
+    # Paragraphs are grouped in sections of up to 100 elements
+    remaining = nodes
+    section = 0
+    while remaining > 0:
+        count = min(remaining, 100)
+        html.append('<div id="section-%d">' % section)
+        html.extend('<p>%s</p>' % text(rand.randint(20, 80)) for _ in range(count - 1))
+        html.append('</div>')
+        remaining -= count
+        section += 1
+
+    for index in range(images):
+        html.append('<img src="%simage/%d.png" width="16" height="16" alt="">' %
+                    (PREFIX, seed + index))
+
+    # Subframes are smaller pages without images and further subframes
+    for index in range(frames):
+        query = urllib.urlencode([('nodes', max(1, nodes // 10)), ('seed', seed + index + 1)])
+        html.append('<iframe src="%spage.html?%s"></iframe>' % (PREFIX, query))
+
+    if weight:
+        html.append('<pre id="weight">%s</pre>' % text(weight * 1024))
+
+    html.append('</body></html>')
+
+    return '\n'.join(html)
+
+
+def parse_params(query):
+    """Returns the page parameters from a query string.
+
+    Missing parameters get their default value, and values are limited to
+    their maximum.
+
+    :raises ValueError: If a value is not a non-negative integer.
+    """
+    values = dict(pair.split('=', 1) for pair in query.split('&') if '=' in pair)
+
+    params = OrderedDict()
+    for name, (default, maximum) in PAGE_PARAMS.items():
+        value = int(values.get(name, default))
+        if value < 0:
+            raise ValueError('Invalid value for "%s": %s' % (name, value))
+        params[name] = min(value, maximum)
+
+    return params
+
+
+def get_url(marionette, **params):
+    """Returns the URL of a generated page on the server of the test runner.
+
+    Example::
+
+        url = get_url(self.marionette, nodes=10000, images=50)
+
+    :param marionette: The Marionette instance with the base URL.
+    :param params: Parameters of the page. See :class:`PageGenerator`.
+    """
+    query = urllib.urlencode(sorted(params.items()))
+    return marionette.absolute_url('%spage.html?%s' % (PREFIX[1:], query))
@@ -0,0 +1,169 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import os
+import sys
+import time
+
+import firefox_puppeteer
+from firefox_puppeteer.wait import Wait
+
+
+_puppeteer_root = firefox_puppeteer.root + os.sep
+_puppeteer_tests = os.path.join(firefox_puppeteer.root, 'tests') + os.sep
+
+
+class CommandRecorder(object):
+    """Records all commands sent by a Marionette client.
+
+    Commands are counted and timed per test, and grouped by the name of the
+    command, and by the puppeteer method which has issued it. For script
+    commands the size of the payload is recorded, too.
+
+    :param marionette: The Marionette instance to record the commands of.
+    """
+
+    def __init__(self, marionette):
+        self.marionette = marionette
+        self.tests = []
+
+        self._current = None
+        self._send_message = None
+
+    def install(self):
+        """Starts recording by wrapping the client's `_send_message` method."""
+        if self._send_message:
+            return
+
+        self._send_message = self.marionette._send_message
+
+        def _send_message(command, response_key='ok', **kwargs):
+            start = time.time()
+            try:
+                return self._send_message(command, response_key, **kwargs)
+            finally:
+                self._record(command, time.time() - start, kwargs)
+
+        self.marionette._send_message = _send_message
+
+    def uninstall(self):
+        """Stops recording, and restores the client's `_send_message` method."""
+        if self._send_message:
+            self.marionette._send_message = self._send_message
+            self._send_message = None
+
+    def start_test(self, name):
+        """Starts a new report for the given test.
+
+        :param name: The name of the test.
+        """
+        self._current = {
+            'test': name,
+            'commands': 0,
+            'duration': 0.0,
+            'payload': 0,
+            'by_command': {},
+            'by_method': {},
+        }
+        self.tests.append(self._current)
+
+    def stop_test(self):
+        """Finishes the report of the current test.
+
+        :returns: The report of the test.
+        """
+        report, self._current = self._current, None
+        return report
+
+    def summary(self, top=10):
+        """Returns the summary of all recorded tests.
+
+        :param top: Optional, number of top offenders to list per category.
+
+        :returns: Dictionary with the totals, and the top offenders by
+         command name, puppeteer method, test, and wait call site.
+        """
+        by_command = {}
+        by_method = {}
+        for report in self.tests:
+            self._merge(by_command, report['by_command'])
+            self._merge(by_method, report['by_method'])
+
+        def top_offenders(groups):
+            items = sorted(groups.items(), key=lambda item: item[1]['duration'], reverse=True)
+            return [dict(stats, name=name) for name, stats in items[:top]]
+
+        tests = sorted(self.tests, key=lambda report: report['duration'], reverse=True)
+
+        return {
+            'tests': len(self.tests),
+            'commands': sum(report['commands'] for report in self.tests),
+            'duration': sum(report['duration'] for report in self.tests),
+            'payload': sum(report['payload'] for report in self.tests),
+            'top_commands': top_offenders(by_command),
+            'top_methods': top_offenders(by_method),
+            'top_tests': [{'test': report['test'],
+                           'commands': report['commands'],
+                           'duration': report['duration']} for report in tests[:top]],
+            'top_waits': Wait.report()[:top],
+        }
+
+    def save(self, filename, top=10):
+        """Writes the reports of all tests and the summary as JSON file.
+
+        :param filename: Name of the file to write to.
+        :param top: Optional, number of top offenders to list per category.
+        """
+        with open(filename, 'w') as f:
+            json.dump({'tests': self.tests, 'summary': self.summary(top)}, f, indent=2)
+
+    def _record(self, command, duration, params):
+        if self._current is None:
+            return
+
+        payload = 0
+        if 'script' in params:
+            try:
+                payload = len(json.dumps(params))
+            except (TypeError, ValueError):
+                payload = len(params['script'])
+
+        self._current['commands'] += 1
+        self._current['duration'] += duration
+        self._current['payload'] += payload
+
+        stats = {'count': 1, 'duration': duration, 'payload': payload}
+        self._merge(self._current['by_command'], {command: stats})
+        self._merge(self._current['by_method'], {get_puppeteer_caller(): stats})
+
+    @staticmethod
+    def _merge(target, groups):
+        for name, stats in groups.items():
+            entry = target.setdefault(name, {'count': 0, 'duration': 0.0, 'payload': 0})
+            for key in entry:
+                entry[key] += stats[key]
+
+
+def get_puppeteer_caller():
+    """Returns the outermost puppeteer method on the current call stack.
+
+    Only the module paths of the frames are inspected, which is a lot faster
+    than retrieving the full stack via the `inspect` module.
+
+    :returns: The name as `Class.method`, or `(test)` if the command has been
+     sent by the test directly.
+    """
+    caller = '(test)'
+
+    frame = sys._getframe(1)
+    while frame:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_puppeteer_root) and not filename.startswith(_puppeteer_tests):
+            instance = frame.f_locals.get('self')
+            name = frame.f_code.co_name
+            caller = '%s.%s' % (type(instance).__name__, name) if instance is not None else name
+        frame = frame.f_back
+
+    return caller
@@ -0,0 +1,294 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import multiprocessing
+import os
+import Queue
+import time
+import traceback
+
+import mozversion
+from marionette import Marionette
+from mozlog.structured import structuredlog
+
+from .scheduling import schedule
+from .startup import get_group_key
+
+
+# First Marionette port to check for the workers
+BASE_PORT = 2828
+
+
+class ParallelRun(object):
+    """Runs the tests of a runner in multiple Firefox instances in parallel.
+
+    Every worker process creates its own runner, which starts a Firefox
+    instance with a clone of the profile and a separate Marionette port. All
+    workers load pages from the HTTP server of the main process. The workers
+    pull tests from a shared queue, and forward all log messages to the main
+    process, so the results end up in a single mozlog stream and summary.
+
+    Parallel runs are only supported for desktop builds, which are started
+    via the `--binary` option. The options for chunks, repeats, shuffling,
+    and XML output are not supported.
+
+    :param runner: The :class:`~runtests.ReleaseTestRunner` instance, which
+     holds the options and receives the results.
+    :param runner_kwargs: The keyword arguments used to create the runner.
+    """
+
+    def __init__(self, runner, runner_kwargs):
+        self.runner = runner
+        self.runner_kwargs = runner_kwargs
+
+    def run(self, tests):
+        """Runs the tests with the number of workers set for the runner.
+
+        :param tests: List of test files, folders, or manifests.
+        """
+        runner = self.runner
+        logger = runner.logger
+
+        if not runner.bin:
+            raise ValueError('Parallel runs need a Firefox binary to start instances from')
+
+        runner.reset_test_stats()
+        runner.prepare_profile()
+
+        # Manifests are filtered for desktop builds without starting a browser
+        runner._device = 'desktop'
+        runner._appName = 'Firefox'
+        for test in tests:
+            runner.add_test(test)
+
+        version_info = mozversion.get_version(binary=runner.bin, sources=runner.sources)
+        logger.suite_start(runner.tests, version_info=version_info)
+
+        for test in runner.manifest_skipped_tests:
+            name = os.path.basename(test['path'])
+            logger.test_start(name)
+            logger.test_end(name, 'SKIP', message=test['disabled'])
+            runner.todo += 1
+
+        # All workers share the webserver of the main process. Server roots,
+        # which are URLs already, are passed to the workers as they are.
+        if os.path.isdir(runner.server_root):
+            runner.start_httpd(False)
+
+        try:
+            self.run_workers()
+        finally:
+            if runner.httpd:
+                runner.httpd.stop()
+                runner.httpd = None
+
+        logger.suite_end()
+
+    def run_workers(self):
+        """Runs the collected tests in the workers, and logs the summaries."""
+        runner = self.runner
+        logger = runner.logger
+
+        workers = min(runner.workers, len(runner.tests))
+        test_queue = multiprocessing.Queue()
+        message_queue = multiprocessing.Queue()
+
+        # Pulling tests in the order of the longest processing time first keeps
+        # the workers busy until the end
+        predicted = None
+        if runner.history:
+            _, loads = schedule(runner.tests, runner.history, workers)
+            predicted = max(loads)
+            runner.tests.sort(key=lambda test: (-runner.history.estimate(test['filepath']),
+                                                test['filepath']))
+
+        # Tests with equal startup requirements are queued next to each other,
+        # so the workers have to restart Firefox as rarely as possible
+        runner.tests.sort(key=lambda test: get_group_key(test.get('startup_prefs') or {}))
+
+        for test in runner.tests:
+            test_queue.put(test)
+        for _ in range(workers):
+            test_queue.put(None)
+
+        start = time.time()
+        processes = []
+        ports = get_free_ports(workers)
+        for index, port in enumerate(ports, 1):
+            process = multiprocessing.Process(
+                target=run_worker,
+                args=(type(runner), self.get_worker_kwargs(index, port),
+                      index, test_queue, message_queue))
+            process.start()
+            processes.append(process)
+
+        logger.info('Running %d tests in %d workers' % (len(runner.tests), workers))
+        self.process_messages(message_queue, processes)
+
+        for process in processes:
+            process.join()
+
+        self.log_summary()
+        if predicted is not None:
+            runner.log_makespan(predicted, time.time() - start)
+        runner.write_reports()
+
+    def get_worker_kwargs(self, index, port):
+        """Returns the keyword arguments for the runner of a worker.
+
+        Output files of the worker get the index of the worker appended.
+
+        :param index: The index of the worker, starting at 1.
+        :param port: The Marionette port for the worker.
+        """
+        # The history file is only updated by the main process
+        kwargs = dict(self.runner_kwargs, workers=1, marionette_port=port, durations_file=None)
+        kwargs.pop('logger', None)
+
+        if self.runner.httpd:
+            kwargs['server_root'] = self.runner.httpd.get_url()
+
+        # All workers start from the same template profile
+        if self.runner.profile:
+            kwargs.update(profile=self.runner.profile, profile_cache=None)
+
+        for key in ('command_report', 'gecko_log', 'trace_file'):
+            if kwargs.get(key) and kwargs[key] != '-':
+                name, ext = os.path.splitext(kwargs[key])
+                kwargs[key] = '%s-%d%s' % (name, index, ext)
+        if not kwargs.get('gecko_log'):
+            kwargs['gecko_log'] = 'gecko-%d.log' % index
+
+        return kwargs
+
+    def log_summary(self):
+        """Logs the merged results of all workers."""
+        runner = self.runner
+        logger = runner.logger
+
+        logger.info('\nSUMMARY\n-------')
+        logger.info('passed: %d' % runner.passed)
+        if runner.unexpected_successes == 0:
+            logger.info('failed: %d' % runner.failed)
+        else:
+            logger.info('failed: %d (unexpected sucesses: %d)' %
+                        (runner.failed, runner.unexpected_successes))
+        if runner.skipped == 0:
+            logger.info('todo: %d' % runner.todo)
+        else:
+            logger.info('todo: %d (skipped: %d)' % (runner.todo, runner.skipped))
+
+        if runner.failed > 0:
+            logger.info('\nFAILED TESTS\n-------')
+            for failed_test in runner.failures:
+                logger.info('%s' % failed_test[0])
+
+    def process_messages(self, message_queue, processes):
+        """Forwards log messages and collects results until all workers are done.
+
+        :param message_queue: The queue the workers send their messages to.
+        :param processes: List of worker processes.
+        """
+        runner = self.runner
+        pending = set(range(1, len(processes) + 1))
+        tests_run = 0
+
+        while pending:
+            try:
+                message = message_queue.get(timeout=1)
+            except Queue.Empty:
+                # Workers which died without a result will never report back
+                for index, process in enumerate(processes, 1):
+                    if index in pending and not process.is_alive():
+                        runner.logger.error('Worker %d exited unexpectedly' % index)
+                        runner.failed += 1
+                        pending.discard(index)
+                continue
+
+            if message[0] == 'log':
+                for handler in runner.logger.handlers:
+                    handler(message[1])
+
+            elif message[0] == 'done':
+                _, index, results = message
+                pending.discard(index)
+
+                for key in ('failed', 'passed', 'skipped', 'todo', 'unexpected_successes'):
+                    setattr(runner, key, getattr(runner, key) + results[key])
+                runner.failures.extend(results['failures'])
+                runner.durations.update(results['durations'])
+                tests_run += results['tests']
+
+        # Tests are left in the queue if all workers stopped early
+        if tests_run < len(runner.tests):
+            runner.logger.error('%d tests have not been run' % (len(runner.tests) - tests_run))
+            runner.failed += len(runner.tests) - tests_run
+
+
+def get_free_ports(count):
+    """Returns the given number of available Marionette ports.
+
+    :param count: The number of ports.
+    """
+    ports = []
+    port = BASE_PORT
+    while len(ports) < count:
+        if Marionette.is_port_available(port, host='localhost'):
+            ports.append(port)
+        port += 1
+
+    return ports
+
+
+def run_worker(runner_class, runner_kwargs, index, test_queue, message_queue):
+    """Runs tests from the queue in a new Firefox instance.
+
+    This is the entry point of the worker processes.
+
+    :param runner_class: The runner class to use.
+    :param runner_kwargs: The keyword arguments to create the runner with.
+    :param index: The index of the worker, starting at 1.
+    :param test_queue: The queue to get tests from. `None` stops the worker.
+    :param message_queue: The queue to send log messages and results to.
+    """
+    logger = structuredlog.StructuredLogger('firefox-ui-worker-%d' % index)
+    logger.add_handler(lambda data: message_queue.put(('log', data)))
+    structuredlog.set_default_logger(logger)
+
+    runner = runner_class(logger=logger, **runner_kwargs)
+    runner.reset_test_stats()
+    tests_run = 0
+
+    try:
+        runner.start_marionette()
+        runner.start_httpd(False)
+
+        for test in iter(test_queue.get, None):
+            tests_run += 1
+            runner.apply_startup_prefs(test.get('startup_prefs') or {})
+            runner.run_test(test['filepath'], test['expected'], test['test_container'])
+            if not runner.session and runner.marionette.check_for_crash():
+                logger.error('Worker %d stops after a crash of Firefox' % index)
+                break
+    except Exception:
+        logger.error('Worker %d failed: %s' % (index, traceback.format_exc()))
+        runner.failed += 1
+
+    finally:
+        message_queue.put(('done', index, {
+            'durations': runner.durations,
+            'failed': runner.failed,
+            'failures': runner.failures,
+            'passed': runner.passed,
+            'skipped': runner.skipped,
+            'tests': tests_run,
+            'todo': runner.todo,
+            'unexpected_successes': runner.unexpected_successes,
+        }))
+
+        runner.write_reports()
+        if runner.marionette and runner.marionette.instance:
+            runner.marionette.instance.close()
+            runner.marionette.instance = None
+        runner.cleanup()
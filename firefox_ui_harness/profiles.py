@@ -0,0 +1,102 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import mozversion
+from mozprofile import Profile
+from mozrunner import FirefoxRunner
+
+
+# Files of a running Firefox which must not end up in the template
+LOCK_FILES = ('.parentlock', 'lock', 'parent.lock')
+
+
+class ProfileTemplateCache(object):
+    """Creates warmed up profile templates, which are reused across runs.
+
+    On the first start with a new profile Firefox creates its databases and
+    caches, which delays the first test. A template profile gets created once
+    per build ID and set of preferences, and Firefox is started with it once
+    via `-silent`, so it has already been initialized. Each Firefox instance
+    then starts with a copy of the template.
+
+    :param folder: The folder to store the templates in.
+    :param timeout: Optional, the time in seconds to wait for the warm up.
+    """
+
+    def __init__(self, folder, timeout=60):
+        self.folder = folder
+        self.timeout = timeout
+
+    def get(self, binary, prefs):
+        """Returns the path of the template for the binary and the preferences.
+
+        The template gets created if it does not exist yet.
+
+        :param binary: Path of the Firefox binary.
+        :param prefs: Dictionary of preferences to set in the profile.
+
+        :returns: The path of the template profile.
+        """
+        path = os.path.join(self.folder, self.get_key(binary, prefs))
+        if os.path.isdir(path):
+            return path
+
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+
+        # Build the template aside, so parallel runs never see a partial profile
+        tmp_path = tempfile.mkdtemp(prefix='tmp-', dir=self.folder)
+        try:
+            profile = Profile(profile=tmp_path, preferences=prefs, restore=False)
+            self.warm_up(binary, profile)
+
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                if not os.path.isdir(path):
+                    raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        return path
+
+    @staticmethod
+    def get_key(binary, prefs):
+        """Returns the name of the template for the binary and the preferences.
+
+        :param binary: Path of the Firefox binary.
+        :param prefs: Dictionary of preferences to set in the profile.
+        """
+        build_id = mozversion.get_version(binary=binary).get('application_buildid', 'unknown')
+        prefs_hash = hashlib.sha1(json.dumps(prefs, sort_keys=True)).hexdigest()
+
+        return '%s-%s' % (build_id, prefs_hash[:12])
+
+    def warm_up(self, binary, profile):
+        """Starts Firefox once without a window to initialize the profile.
+
+        :param binary: Path of the Firefox binary.
+        :param profile: The :class:`mozprofile.Profile` to initialize.
+        """
+        env = os.environ.copy()
+        env['MOZ_CRASHREPORTER_DISABLE'] = '1'
+
+        runner = FirefoxRunner(binary=binary, profile=profile, env=env,
+                               cmdargs=['-no-remote', '-silent'])
+        runner.start()
+        try:
+            runner.wait(timeout=self.timeout)
+        finally:
+            runner.stop()
+
+        for name in LOCK_FILES:
+            path = os.path.join(profile.profile, name)
+            if os.path.lexists(path):
+                os.remove(path)
@@ -3,16 +3,29 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import copy
+import os
+import random
 import sys
+import time
 
+import moznetwork
 from marionette import BaseMarionetteTestRunner
 from marionette.runtests import cli
+from manifestparser import TestManifest
 
 import firefox_ui_tests
 
 from .arguments import ReleaseTestParser
 from .default_prefs import default_prefs
+from .instrumentation import CommandRecorder
+from .parallel import ParallelRun
+from .profiles import ProfileTemplateCache
+from .scheduling import DurationHistory, schedule
+from .server import ResourceServer
+from .session import WarmSession, restart_browser
+from .startup import get_group_key, get_startup_prefs, group_tests
 from .testcase import FirefoxTestCase
+from .tracing import TraceRecorder
 
 
 class ReleaseTestRunner(BaseMarionetteTestRunner):
@@ -25,9 +38,234 @@ class ReleaseTestRunner(BaseMarionetteTestRunner):
         runner_prefs.update(prefs)
         kwargs['prefs'] = runner_prefs
 
+        # Keep the options to create the runners of parallel workers
+        self.runner_kwargs = dict(kwargs)
+
+        self.marionette_port = kwargs.pop('marionette_port', None)
+        self.workers = kwargs.pop('workers', 1)
+
+        self.command_report = kwargs.pop('command_report', None)
+        self.command_recorder = None
+        self.trace_file = kwargs.pop('trace_file', None)
+        self.tracer = None
+        self.warm_session = kwargs.pop('warm_session', False)
+        self.session = None
+
+        # Startup preferences of tests from manifests, and of the running instance
+        self.startup_prefs = {}
+        self.current_startup_prefs = {}
+        self.config_restarts = []
+
+        profile_cache = kwargs.pop('profile_cache', None)
+        self.profile_cache = ProfileTemplateCache(profile_cache) if profile_cache else None
+
+        durations_file = kwargs.pop('durations_file', None)
+        self.durations = {}
+        self.history = DurationHistory(durations_file) if durations_file else None
+
+        self.reports_written = False
+
         BaseMarionetteTestRunner.__init__(self, *args, **kwargs)
         self.test_handlers = [FirefoxTestCase]
 
+        # Mixin hooks are the last step of the base runner before the suite ends
+        self.mixin_run_tests.append(lambda tests: self.write_reports())
+
+    def _build_kwargs(self):
+        kwargs = BaseMarionetteTestRunner._build_kwargs(self)
+        if self.marionette_port:
+            kwargs['port'] = self.marionette_port
+
+        return kwargs
+
+    def add_test(self, test, expected='pass', test_container=None):
+        filepath = os.path.abspath(test)
+        if filepath.endswith('.ini'):
+            manifest = TestManifest()
+            manifest.read(filepath)
+            for entry in manifest.tests:
+                prefs = get_startup_prefs(entry)
+                if prefs:
+                    self.startup_prefs[os.path.abspath(entry['path'])] = prefs
+
+        count = len(self.tests)
+        BaseMarionetteTestRunner.add_test(self, test, expected, test_container)
+        for added in self.tests[count:]:
+            added['startup_prefs'] = self.startup_prefs.get(added['filepath'], {})
+
+    def apply_startup_prefs(self, prefs):
+        """Restarts Firefox if it has not been started with the given preferences.
+
+        :param prefs: Dictionary of startup preferences required by a test.
+        """
+        if get_group_key(prefs) == get_group_key(self.current_startup_prefs):
+            return
+
+        if not self.marionette.instance:
+            self.logger.warning('Firefox has not been started by the runner, so the startup '
+                                'prefs %s cannot be applied' % prefs)
+            self.current_startup_prefs = prefs
+            return
+
+        start = time.time()
+        restart_browser(self.marionette, dict(self.prefs or {}, **prefs))
+        self.current_startup_prefs = prefs
+
+        duration = time.time() - start
+        self.config_restarts.append((prefs, duration))
+        self.logger.info('Restarted Firefox with startup prefs %s (%.1fs)' % (prefs, duration))
+
+    def run_test(self, filepath, expected, test_container):
+        start = time.time()
+        try:
+            BaseMarionetteTestRunner.run_test(self, filepath, expected, test_container)
+        finally:
+            self.durations[filepath] = time.time() - start
+
+    def run_test_set(self, tests):
+        if self.shuffle:
+            random.seed(self.shuffle_seed)
+            random.shuffle(tests)
+
+        # Firefox only gets restarted between groups of equal startup requirements
+        for prefs, group in group_tests(tests):
+            self.apply_startup_prefs(prefs)
+            for test in group:
+                self.run_test(test['filepath'], test['expected'], test['test_container'])
+
+                # In warm session mode Firefox has already been restarted after a crash
+                if not self.session and self.marionette.check_for_crash():
+                    return
+
+    def run_test_sets(self):
+        if not self.history:
+            BaseMarionetteTestRunner.run_test_sets(self)
+            return
+
+        if len(self.tests) < 1:
+            raise Exception('There are no tests to run.')
+        elif self.total_chunks > len(self.tests):
+            raise ValueError('Total number of chunks must be between 1 and %d.' %
+                             len(self.tests))
+
+        if self.total_chunks > 1:
+            chunks, loads = schedule(self.tests, self.history, self.total_chunks)
+            self.logger.info('Running chunk %d of %d (%d tests selected from a total of %d)' %
+                             (self.this_chunk, self.total_chunks,
+                              len(chunks[self.this_chunk - 1]), len(self.tests)))
+            self.tests = chunks[self.this_chunk - 1]
+            predicted = loads[self.this_chunk - 1]
+        else:
+            predicted = sum(self.history.estimate(test['filepath']) for test in self.tests)
+
+        start = time.time()
+        self.run_test_set(self.tests)
+        self.log_makespan(predicted, time.time() - start)
+
+    def run_tests(self, tests):
+        if self.workers > 1:
+            ParallelRun(self, self.runner_kwargs).run(tests)
+            return
+
+        try:
+            BaseMarionetteTestRunner.run_tests(self, tests)
+        finally:
+            # Also save the reports if the run has been aborted
+            if not self.reports_written:
+                self.write_reports()
+
+    def log_makespan(self, predicted, actual):
+        """Logs the predicted and the actual wall time of the test run."""
+        self.logger.info('makespan: %.1fs predicted, %.1fs actual' % (predicted, actual))
+
+    def prepare_profile(self):
+        """Uses a cached template as profile, if enabled and no profile has been given."""
+        if self.profile_cache and self.bin and not self.profile:
+            start = time.time()
+            self.profile = self.profile_cache.get(self.bin, self.prefs)
+            self.logger.info('profile template: %s (%.1fs)' % (self.profile, time.time() - start))
+
+    def start_httpd(self, need_external_ip):
+        # Server roots can also be URLs, e.g. the server of the main process for workers
+        if not os.path.isdir(self.server_root):
+            BaseMarionetteTestRunner.start_httpd(self, need_external_ip)
+            return
+
+        host = moznetwork.get_ip() if need_external_ip else '127.0.0.1'
+        self.httpd = ResourceServer(self.server_root, host=host)
+        self.httpd.start()
+
+        if self.marionette:
+            self.marionette.baseurl = self.httpd.get_url()
+        self.logger.info('running webserver on %s (%d resources)' %
+                         (self.httpd.get_url(), len(self.httpd.resources)))
+
+    def start_marionette(self):
+        self.prepare_profile()
+        BaseMarionetteTestRunner.start_marionette(self)
+
+        if self.command_report:
+            self.command_recorder = CommandRecorder(self.marionette)
+            self.command_recorder.install()
+            self.test_kwargs['command_recorder'] = self.command_recorder
+
+        if self.trace_file:
+            self.tracer = TraceRecorder(self.marionette)
+            self.tracer.install()
+            self.test_kwargs['tracer'] = self.tracer
+
+        if self.warm_session:
+            self.session = WarmSession(self.logger)
+            self.test_kwargs['warm_session'] = self.session
+
+    def write_reports(self):
+        """Writes the duration history, trace, command report, and restart summary."""
+        self.reports_written = True
+
+        if self.session:
+            self.logger.info('restarts: %d' % len(self.session.restarts))
+            for reason in self.session.restarts:
+                self.logger.info('restart: %s' % reason)
+
+        if self.config_restarts:
+            self.logger.info('startup prefs restarts: %d (%.1fs)' %
+                             (len(self.config_restarts),
+                              sum(duration for _, duration in self.config_restarts)))
+
+        if isinstance(self.httpd, ResourceServer):
+            stats = self.httpd.stats.to_dict()
+            self.logger.info('webserver: %d requests (%d not found, %d bytes), latency p50 '
+                             '%.1fms, p95 %.1fms, max %.1fms' %
+                             (stats['requests'], stats['not_found'], stats['bytes'],
+                              stats['p50'], stats['p95'], stats['max']))
+
+        if self.history and self.durations:
+            for filepath, duration in self.durations.items():
+                self.history.add(filepath, duration)
+            self.history.save()
+
+        if self.tracer:
+            self.tracer.uninstall()
+            self.tracer.save(self.trace_file)
+            self.logger.info('trace: %s' % self.trace_file)
+
+        if self.command_recorder:
+            self.command_recorder.save(self.command_report)
+
+            summary = self.command_recorder.summary(top=5)
+            self.logger.info('\nCOMMANDS\n-------')
+            self.logger.info('commands: %d (%.2fs, %d bytes of scripts)' %
+                             (summary['commands'], summary['duration'],
+                              summary['payload']))
+            for method in summary['top_methods']:
+                self.logger.info('%s: %d commands (%.2fs)' %
+                                 (method['name'], method['count'], method['duration']))
+            for wait in summary['top_waits']:
+                self.logger.info('wait %s: %d calls, %d polls (%.2fs)' %
+                                 (wait['call_site'], wait['calls'], wait['polls'],
+                                  wait['duration']))
+            self.logger.info('report: %s' % self.command_report)
+
 
 def run():
     cli(runner_class=ReleaseTestRunner, parser_class=ReleaseTestParser)
@@ -0,0 +1,112 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import heapq
+import json
+import os
+
+
+# Estimated duration in seconds for test files without history and data
+DEFAULT_DURATION = 30.0
+
+
+class DurationHistory(object):
+    """Stores the wall time of test files from previous runs.
+
+    The estimated duration of a test file is the mean of its last runs. Test
+    files which have not been run yet are estimated by the median of all
+    known test files.
+
+    :param filename: Path of the JSON file to store the history in.
+    :param max_runs: Optional, the number of runs to keep per test file.
+    """
+
+    def __init__(self, filename, max_runs=5):
+        self.filename = filename
+        self.max_runs = max_runs
+
+        self.durations = {}
+        if os.path.isfile(filename):
+            with open(filename) as f:
+                self.durations = json.load(f)
+
+    def add(self, filepath, duration):
+        """Adds the duration of a test file run.
+
+        :param filepath: The path of the test file.
+        :param duration: The wall time of the run in seconds.
+        """
+        runs = self.durations.setdefault(self._get_key(filepath), [])
+        runs.append(round(duration, 3))
+        del runs[:-self.max_runs]
+
+    def estimate(self, filepath):
+        """Returns the estimated duration of a test file.
+
+        :param filepath: The path of the test file.
+
+        :returns: The duration in seconds.
+        """
+        runs = self.durations.get(self._get_key(filepath))
+        if runs:
+            return sum(runs) / len(runs)
+
+        return self.default_duration
+
+    @property
+    def default_duration(self):
+        """The estimated duration for test files without history."""
+        means = sorted(sum(runs) / len(runs) for runs in self.durations.values() if runs)
+        if not means:
+            return DEFAULT_DURATION
+
+        return means[len(means) // 2]
+
+    def save(self):
+        """Writes the history to its file."""
+        folder = os.path.dirname(os.path.abspath(self.filename))
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+        with open(self.filename, 'w') as f:
+            json.dump(self.durations, f, indent=2, separators=(',', ': '), sort_keys=True)
+
+    @staticmethod
+    def _get_key(filepath):
+        # Use paths relative to the checkout, so the history survives moves
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        filepath = os.path.abspath(filepath)
+        if filepath.startswith(root + os.sep):
+            filepath = os.path.relpath(filepath, root)
+
+        return filepath.replace(os.sep, '/')
+
+
+def schedule(tests, history, count):
+    """Distributes tests to bins by longest processing time first.
+
+    Tests are sorted by their estimated duration, and each test is added to
+    the bin with the lowest load so far. Ties are broken by the test path,
+    so the result only depends on the history.
+
+    :param tests: List of test dictionaries as created by the runner.
+    :param history: The :class:`DurationHistory` to estimate durations from.
+    :param count: The number of bins, e.g. workers or chunks.
+
+    :returns: Tuple of the list of bins, and the list of their estimated loads.
+    """
+    estimated = sorted(((history.estimate(test['filepath']), test) for test in tests),
+                       key=lambda item: (-item[0], item[1]['filepath']))
+
+    bins = [[] for _ in range(count)]
+    loads = [0.0] * count
+    heap = [(0.0, index) for index in range(count)]
+
+    for duration, test in estimated:
+        load, index = heapq.heappop(heap)
+        bins[index].append(test)
+        loads[index] = load + duration
+        heapq.heappush(heap, (loads[index], index))
+
+    return bins, loads
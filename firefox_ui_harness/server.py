@@ -0,0 +1,246 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import BaseHTTPServer
+import errno
+import mimetypes
+import os
+import socket
+import sys
+import threading
+import time
+import urllib
+import urlparse
+from SocketServer import ThreadingMixIn
+
+from .generator import PREFIX, PageGenerator
+
+
+class ResourceServer(object):
+    """HTTP server, which serves a folder of static resources from memory.
+
+    All files are read once when the server gets started. Connections are
+    kept alive via HTTP/1.1, and every connection is handled in its own
+    thread, so multiple browsers can share a single server. The interface
+    matches :class:`mozhttpd.MozHttpd`, so it can replace the server of the
+    Marionette test runner.
+
+    Generated pages of a given size are served below `/generated/`. See
+    :class:`~generator.PageGenerator` for details.
+
+    :param docroot: The folder to serve.
+    :param host: Optional, the host to serve from. Defaults to `127.0.0.1`.
+    :param port: Optional, the port to serve from. Defaults to a free port.
+    """
+
+    def __init__(self, docroot, host='127.0.0.1', port=0):
+        self.docroot = docroot
+        self.host = host
+        self.port = int(port)
+
+        self.httpd = None
+        self.generator = PageGenerator()
+        self.resources = {}
+        self.stats = RequestStats()
+
+        self._thread = None
+
+    def get_resource(self, path, query=''):
+        """Returns the tuple of content type and content for a path, or `None`.
+
+        :param path: The path of the request.
+        :param query: Optional, the query string of the request.
+        """
+        if path.startswith(PREFIX):
+            return self.generator.get(path[len(PREFIX):], query)
+
+        return self.resources.get(path)
+
+    def get_url(self, path='/'):
+        """Returns the URL of a path on the server.
+
+        :param path: Optional, the path to append to the URL. Defaults to `/`.
+        """
+        if not self.httpd:
+            return None
+
+        return 'http://%s:%s%s' % (self.host, self.httpd.server_port, path)
+
+    def load(self):
+        """Reads all files of the document root into memory."""
+        self.resources = {}
+
+        for root, dirs, files in os.walk(self.docroot):
+            for filename in files:
+                filepath = os.path.join(root, filename)
+                path = '/' + os.path.relpath(filepath, self.docroot).replace(os.sep, '/')
+                content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+                with open(filepath, 'rb') as f:
+                    self.resources[path] = (content_type, f.read())
+
+        # Folders are served via their index file
+        for path, resource in self.resources.items():
+            if path.endswith('/index.html'):
+                self.resources[path[:-len('index.html')]] = resource
+
+    def start(self, block=False):
+        """Loads the resources and starts the server.
+
+        :param block: Optional, if `True` serve until the process is stopped.
+         Defaults to serving in a separate thread.
+        """
+        self.load()
+
+        self.httpd = ResourceHTTPServer((self.host, self.port), self.get_resource,
+                                        record=self.stats.add)
+        if block:
+            self.httpd.serve_forever()
+        else:
+            self._thread = threading.Thread(target=self.httpd.serve_forever)
+            self._thread.setDaemon(True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the server. Does nothing if the server is not running."""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.close_connections()
+            self.httpd.server_close()
+        self.httpd = None
+
+
+class ResourceHTTPServer(ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """HTTP server, which handles requests with a :class:`ResourceRequestHandler`.
+
+    :param server_address: The tuple of host and port to serve from.
+    :param get_resource: Callable which gets the path and the query string of
+     a request, and returns the tuple of content type and content, or `None`.
+    :param record: Optional, callable which gets the status, size, and
+     duration of every handled request.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    # Parallel workers open many connections at once
+    request_queue_size = 128
+
+    def __init__(self, server_address, get_resource, record=None):
+        BaseHTTPServer.HTTPServer.__init__(self, server_address, ResourceRequestHandler)
+
+        self.get_resource = get_resource
+        self.record = record
+
+        self.connections = set()
+        self._lock = threading.Lock()
+
+    def close_connections(self):
+        """Closes all kept alive connections, so their threads finish."""
+        with self._lock:
+            connections = list(self.connections)
+
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def process_request_thread(self, request, client_address):
+        with self._lock:
+            self.connections.add(request)
+        try:
+            ThreadingMixIn.process_request_thread(self, request, client_address)
+        finally:
+            with self._lock:
+                self.connections.discard(request)
+
+    def handle_error(self, request, client_address):
+        # The browser closes kept alive connections whenever it likes
+        error = sys.exc_info()[1]
+        if not (isinstance(error, (socket.error, IOError)) and
+                error.errno in (errno.ECONNABORTED, errno.ECONNRESET, errno.EPIPE)):
+            BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+
+class ResourceRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Idle kept alive connections are closed after this number of seconds
+    timeout = 60
+
+    def do_GET(self):
+        self.send_resource(include_body=True)
+
+    def do_HEAD(self):
+        self.send_resource(include_body=False)
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_resource(self, include_body):
+        start = time.time()
+
+        url = urlparse.urlsplit(self.path)
+        path = urllib.unquote(url.path)
+        resource = self.server.get_resource(path, url.query)
+        if resource:
+            status = 200
+            content_type, content = resource
+        else:
+            status = 404
+            content_type, content = 'text/plain', 'Not found: %s' % path
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(content)
+
+        if self.server.record:
+            self.server.record(status, len(content), time.time() - start)
+
+
+class RequestStats(object):
+    """Thread-safe statistics of the requests handled by a server."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.latencies = []
+        self.not_found = 0
+
+        self._lock = threading.Lock()
+
+    def add(self, status, size, duration):
+        """Adds a handled request.
+
+        :param status: The HTTP status code of the response.
+        :param size: The size of the response body in bytes.
+        :param duration: The time to handle the request in seconds.
+        """
+        with self._lock:
+            self.bytes += size
+            self.latencies.append(duration)
+            if status == 404:
+                self.not_found += 1
+
+    def to_dict(self):
+        """Returns the number of requests, bytes, and latency percentiles in ms."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+
+        def percentile(value):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * value))] * 1000
+
+        return {
+            'bytes': self.bytes,
+            'not_found': self.not_found,
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'max': percentile(1),
+            'requests': len(latencies),
+        }
+
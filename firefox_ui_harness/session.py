@@ -0,0 +1,152 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import socket
+import time
+
+from marionette.errors import MarionetteException
+
+
+# Timeouts in milliseconds of a new Marionette session
+DEFAULT_SEARCH_TIMEOUT = 0
+DEFAULT_SCRIPT_TIMEOUT = 30000
+
+
+class WarmSession(object):
+    """Keeps the Marionette session alive across tests.
+
+    By default every test deletes its Marionette session, and the next test
+    starts a new one. In warm session mode the session is kept for the whole
+    run, and Firefox only gets restarted with a clean profile if a test has
+    left the browser in a dirty state, or if Firefox has crashed or exited.
+
+    :param logger: The logger to report restarts to.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+
+        self.dirty = None
+        self.restarts = []
+
+    def clean_test(self, test):
+        """Finishes a test without deleting the session.
+
+        This replaces :func:`marionette.MarionetteTestCase.cleanTest`.
+
+        :param test: The test case instance which has been finished.
+        """
+        marionette = test.marionette
+        if hasattr(test, 'start_time'):
+            test.duration = time.time() - test.start_time
+
+        if marionette:
+            if not self.is_alive(marionette):
+                self.dirty = 'Firefox has crashed or exited in %s' % test.id()
+
+            if marionette.session is not None and not self.dirty:
+                try:
+                    test.loglines.extend(marionette.get_logs())
+                except Exception as e:
+                    test.loglines = [['Error getting log: %s' % e]]
+
+                # A kept session has to start the next test like a new one
+                self.reset_session(marionette)
+
+            if self.dirty:
+                self.restart(marionette)
+
+        test.marionette = None
+
+    @staticmethod
+    def is_alive(marionette):
+        """Checks if the Firefox instance is still running.
+
+        :param marionette: The Marionette instance to check.
+        """
+        if marionette.check_for_crash():
+            return False
+
+        instance = marionette.instance
+        return not (instance and instance.runner and not instance.runner.is_running())
+
+    @staticmethod
+    def reset_session(marionette):
+        """Resets the timeouts and the context, which a test might have changed.
+
+        :param marionette: The Marionette instance of the kept session.
+        """
+        marionette._reset_timeouts()
+        if marionette.timeout is None:
+            # Only the page load timeout gets reset without a default timeout
+            marionette.timeouts(marionette.TIMEOUT_SEARCH, DEFAULT_SEARCH_TIMEOUT)
+            marionette.timeouts(marionette.TIMEOUT_SCRIPT, DEFAULT_SCRIPT_TIMEOUT)
+
+        marionette.set_context('content')
+
+    def mark_dirty(self, reason):
+        """Marks the browser as dirty, so it gets restarted after the test.
+
+        :param reason: The reason for the restart.
+        """
+        self.dirty = self.dirty or reason
+
+    def restart(self, marionette):
+        """Restarts Firefox with a clean profile, and records the reason.
+
+        If Firefox has not been started by the runner, e.g. with `--address`,
+        only the session gets deleted.
+
+        :param marionette: The Marionette instance to restart.
+        """
+        self.logger.info('Restarting Firefox: %s' % self.dirty)
+        self.restarts.append(self.dirty)
+        self.dirty = None
+
+        if not marionette.instance:
+            self.logger.warning('Firefox has not been started by the runner, so only the '
+                                'session gets deleted')
+            delete_session(marionette)
+            return
+
+        restart_browser(marionette)
+
+
+def delete_session(marionette):
+    """Deletes the Marionette session, so the next test starts a new one.
+
+    :param marionette: The Marionette instance of the session.
+    """
+    if marionette.session is None:
+        return
+
+    try:
+        marionette.delete_session()
+    except (socket.error, MarionetteException, IOError):
+        # Firefox has crashed or exited
+        marionette.session = None
+        try:
+            marionette.client.close()
+        except socket.error:
+            pass
+
+
+def restart_browser(marionette, prefs=None):
+    """Restarts Firefox with a clean profile.
+
+    The session is not started again. This is done by the next test.
+
+    :param marionette: The Marionette instance to restart.
+    :param prefs: Optional, the preferences to start Firefox with. Defaults
+     to the preferences of the current instance.
+    """
+    # The old session is gone with the process, so don't try to delete it
+    marionette.client.close()
+    marionette.session = None
+    marionette.session_id = None
+    marionette.window = None
+
+    instance = marionette.instance
+    instance.restart(prefs=instance.prefs if prefs is None else prefs, clean=True)
+    assert marionette.wait_for_port(), 'Timed out waiting for port!'
@@ -0,0 +1,72 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Startup requirements of tests, which are declared in manifests.
+
+Tests can declare the preferences Firefox has to be started with via the
+following manifest keys::
+
+    [test_about_private_browsing.py]
+    e10s = false
+    locale = de
+    prefs = browser.privatebrowsing.autostart:true dom.ipc.processCount:2
+
+Tests with identical requirements are run in a group on a single instance
+of Firefox, which gets restarted only between the groups.
+"""
+
+import json
+
+
+def get_startup_prefs(test):
+    """Returns the startup preferences declared for a manifest entry.
+
+    :param test: The test dictionary from the manifest.
+
+    :returns: Dictionary of preferences.
+    """
+    prefs = {}
+
+    for item in test.get('prefs', '').split():
+        name, _, value = item.partition(':')
+        prefs[name] = cast(value)
+
+    if test.get('e10s'):
+        prefs['browser.tabs.remote.autostart'] = cast(test['e10s'])
+    if test.get('locale'):
+        prefs['general.useragent.locale'] = test['locale']
+
+    return prefs
+
+
+def cast(value):
+    """Converts a preference value from a manifest to a bool, number, or string."""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def get_group_key(prefs):
+    """Returns a hashable and sortable key for the startup preferences."""
+    return tuple(sorted(prefs.items()))
+
+
+def group_tests(tests):
+    """Groups tests by their startup preferences.
+
+    Tests without requirements are run first on the initially started
+    instance, so every other group costs exactly one restart. The order of
+    the tests in a group is kept.
+
+    :param tests: List of test dictionaries as created by the runner.
+
+    :returns: List of tuples of the startup preferences and the tests.
+    """
+    groups = {}
+    for test in tests:
+        prefs = test.get('startup_prefs') or {}
+        groups.setdefault(get_group_key(prefs), (prefs, []))[1].append(test)
+
+    return [groups[key] for key in sorted(groups)]
@@ -2,10 +2,14 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import unittest
+
 from marionette import MarionetteTestCase
 
 from firefox_puppeteer import Puppeteer
 
+from .decorators import apply_skip_conditions
+
 
 class FirefoxTestCase(MarionetteTestCase, Puppeteer):
     """
@@ -13,8 +17,37 @@ class FirefoxTestCase(MarionetteTestCase, Puppeteer):
     libraries are exposed to test scope.
     """
     def __init__(self, *args, **kwargs):
+        self.command_recorder = kwargs.pop('command_recorder', None)
+        self.tracer = kwargs.pop('tracer', None)
+        self.warm_session = kwargs.pop('warm_session', None)
+
         MarionetteTestCase.__init__(self, *args, **kwargs)
 
+    @classmethod
+    def add_tests_to_suite(cls, mod_name, filepath, suite, testloader, marionette, testvars,
+                           **kwargs):
+        tests = unittest.TestSuite()
+        super(FirefoxTestCase, cls).add_tests_to_suite(mod_name, filepath, tests, testloader,
+                                                       marionette, testvars, **kwargs)
+
+        # Skipped tests should not cost any interaction with the browser
+        apply_skip_conditions(tests, marionette)
+        suite.addTests(tests)
+
+    def run(self, result=None):
+        if self.tracer:
+            self.tracer.begin(self.id(), 'test')
+        if self.command_recorder:
+            self.command_recorder.start_test(self.id())
+
+        try:
+            return MarionetteTestCase.run(self, result)
+        finally:
+            if self.command_recorder:
+                self.command_recorder.stop_test()
+            if self.tracer:
+                self.tracer.end(self.id(), 'test')
+
     def setUp(self, *args, **kwargs):
         MarionetteTestCase.setUp(self, *args, **kwargs)
         Puppeteer.set_marionette(self, self.marionette)
@@ -43,5 +76,16 @@ class FirefoxTestCase(MarionetteTestCase, Puppeteer):
                              "This test started the browser with %s open "
                              "top level browsing contexts, but ended with %s." %
                              (self._start_handle_count, win_count))
+        except Exception as e:
+            # Further tests cannot rely on the state of the browser anymore
+            if self.warm_session:
+                self.warm_session.mark_dirty('%s left a dirty browser: %s' % (self.id(), e))
+            raise
         finally:
             MarionetteTestCase.tearDown(self, *args, **kwargs)
+
+    def cleanTest(self):
+        if self.warm_session:
+            self.warm_session.clean_test(self)
+        else:
+            MarionetteTestCase.cleanTest(self)
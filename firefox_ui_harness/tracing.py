@@ -0,0 +1,159 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import os
+import sys
+import thread
+import time
+from contextlib import contextmanager
+
+import firefox_puppeteer
+
+
+_puppeteer_root = firefox_puppeteer.root + os.sep
+_puppeteer_tests = os.path.join(firefox_puppeteer.root, 'tests') + os.sep
+
+
+class TraceRecorder(object):
+    """Records a timeline of a test run in the Chrome trace event format.
+
+    The timeline contains nested spans for tests, their `setUp` and
+    `tearDown` methods, all public puppeteer methods and properties, all
+    `Wait.until` calls, all Marionette commands, and calls of `time.sleep`.
+    The resulting file can be loaded in a trace viewer like
+    `chrome://tracing`.
+
+    :param marionette: The Marionette instance to record the commands of.
+    """
+
+    def __init__(self, marionette):
+        self.marionette = marionette
+        self.events = []
+
+        self._frames = []
+        self._send_message = None
+
+    def begin(self, name, category, **args):
+        """Starts a span.
+
+        :param name: The name of the span.
+        :param category: The category of the span, e.g. `puppeteer`.
+        :param args: Optional, arguments to attach to the span.
+        """
+        self._add_event('B', name, category, args)
+
+    def end(self, name, category):
+        """Ends the span which has been started last.
+
+        :param name: The name of the span.
+        :param category: The category of the span.
+        """
+        self._add_event('E', name, category)
+
+    def install(self):
+        """Starts recording of Marionette commands and Python calls."""
+        if self._send_message:
+            return
+
+        self._send_message = self.marionette._send_message
+
+        def _send_message(command, response_key='ok', **kwargs):
+            with self.span(command, 'marionette'):
+                return self._send_message(command, response_key, **kwargs)
+
+        self.marionette._send_message = _send_message
+        sys.setprofile(self._profile)
+
+    def uninstall(self):
+        """Stops recording, and closes all spans which are still open."""
+        if not self._send_message:
+            return
+
+        sys.setprofile(None)
+        self.marionette._send_message = self._send_message
+        self._send_message = None
+
+        while self._frames:
+            self._frames.pop()
+            self._add_event('E', None, None)
+
+    def save(self, filename):
+        """Writes the recorded events as trace event JSON file.
+
+        :param filename: Name of the file to write to.
+        """
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+    @contextmanager
+    def span(self, name, category, **args):
+        """Records the execution of the `with` block as span.
+
+        :param name: The name of the span.
+        :param category: The category of the span.
+        :param args: Optional, arguments to attach to the span.
+        """
+        self.begin(name, category, **args)
+        try:
+            yield
+        finally:
+            self.end(name, category)
+
+    def _add_event(self, phase, name, category, args=None):
+        event = {
+            'ph': phase,
+            'ts': time.time() * 1000000,
+            'pid': os.getpid(),
+            'tid': thread.get_ident(),
+        }
+        if name:
+            event['name'] = name
+            event['cat'] = category
+        if args:
+            event['args'] = args
+
+        self.events.append(event)
+
+    def _get_span(self, frame):
+        code = frame.f_code
+        if code.co_name.startswith('_'):
+            return None
+
+        instance = frame.f_locals.get('self')
+        class_name = type(instance).__name__ if instance is not None else None
+
+        if code.co_filename.startswith(_puppeteer_root):
+            if code.co_filename.startswith(_puppeteer_tests):
+                return None
+            category = 'puppeteer'
+        elif code.co_name == 'until' and class_name == 'Wait':
+            category = 'wait'
+        elif code.co_name in ('setUp', 'tearDown') and class_name:
+            category = 'test'
+        else:
+            return None
+
+        name = '%s.%s' % (class_name, code.co_name) if class_name else code.co_name
+        return name, category
+
+    def _profile(self, frame, event, arg):
+        if event == 'call':
+            span = self._get_span(frame)
+            if span:
+                self._frames.append(frame)
+                self.begin(*span)
+
+        elif event == 'return' and self._frames and self._frames[-1] is frame:
+            self._frames.pop()
+            self.end(*self._get_span(frame))
+
+        # Make fixed delays visible, which are not covered by other spans
+        elif event == 'c_call' and arg is time.sleep:
+            self._frames.append(arg)
+            self.begin('sleep', 'sleep')
+
+        elif event in ('c_return', 'c_exception') and self._frames and self._frames[-1] is arg:
+            self._frames.pop()
+            self.end('sleep', 'sleep')
@@ -12,14 +12,6 @@ class TestBackForward(FirefoxTestCase):
     def setUp(self):
         FirefoxTestCase.setUp(self)
 
-        with self.marionette.using_context("content"):
-            self.marionette.navigate("about:blank")
-
-        self.marionette.execute_script("""
-            let count = gBrowser.sessionHistory.count;
-            gBrowser.sessionHistory.PurgeHistory(count);
-        """)
-
         self.test_urls = [
             'layout/mozilla.html',
             'layout/mozilla_mission.html',
@@ -28,9 +20,9 @@ class TestBackForward(FirefoxTestCase):
         self.test_urls = [self.marionette.absolute_url(t)
                           for t in self.test_urls]
 
+        self.browser.tabbar.selected_tab.set_session_history(self.test_urls)
+
         with self.marionette.using_context('content'):
-            for url in self.test_urls:
-                self.marionette.navigate(url)
             self.assertEquals(self.marionette.get_url(), self.test_urls[-1])
 
     def test_back_forward(self):